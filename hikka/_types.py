@@ -139,6 +139,10 @@ class ConfigValue:
     value: Any = field(default_factory=_Placeholder)
     validator: Optional[callable] = None
 
+    # Called with the instance, when its value changes.
+    # Bound by `Modules` to persist value in database
+    _on_change = None
+
     def __post_init__(self):
         if isinstance(self.value, _Placeholder):
             self.value = self.default
@@ -201,7 +205,7 @@ class ConfigValue:
                         )
                         value = defaults[self.validator.internal_id]
 
-            # This attribute will tell the `Loader` to save this value in db
-            self._save_marker = True
-
         object.__setattr__(self, key, value)
+
+        if key == "value" and self._on_change is not None:
+            self._on_change(self)
@@ -0,0 +1,83 @@
+"""JSON encoding of database, using orjson, if it's available"""
+
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import json
+import logging
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Exceptions, raised by encoders on non-serializable objects
+EncodeError = (TypeError, ValueError, OverflowError)
+
+if orjson is not None:
+    # Database can contain integer keys, which are converted to strings
+    # by stdlib `json` as well. Types, which orjson encodes natively, but
+    # stdlib `json` rejects, are passed to `_reject`
+    ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+def _reject(obj: Any):
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode object to JSON
+    :raises TypeError: If object is not JSON-serializable
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=ORJSON_OPTIONS, default=_reject)
+        except orjson.JSONEncodeError:
+            # orjson is more strict (e.g. integers must fit in 64 bits),
+            # so let stdlib decide, whether object is serializable
+            pass
+
+    return json.dumps(obj).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def is_serializable(obj: Any) -> bool:
+    """
+    Check, whether object is accepted by stdlib `json`, so the result
+    doesn't depend on orjson presence (e.g. it encodes `UUID` and `Enum`)
+    """
+    try:
+        json.dumps(obj)
+        return True
+    except EncodeError:
+        return False
+
+
+def encode_segment(key: Union[str, int], value: Any) -> bytes:
+    """
+    Encode single item of JSON object, so it can be joined with other
+    ones without re-encoding them (e.g. `"key":{...}`)
+    """
+    return dumps({key: value})[1:-1]
+
+
+def join_segments(segments: list) -> bytes:
+    return b"{" + b",".join(segments) + b"}"
@@ -7,11 +7,21 @@
 #
 # 🔒 Licensed under the GNU GPLv3
 # 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+import functools
 import re
 
 
+@functools.lru_cache(maxsize=64)
 def compat(code: str) -> str:
     """Reformats modules, built for GeekTG to work with Hikka"""
+    if (
+        "..inline import" not in code
+        and "GeekInlineQuery" not in code
+        and "self.inline._bot" not in code
+    ):
+        # Nothing to rewrite, so skip per-line regex substitutions
+        return "\n".join(code.splitlines())
+
     return "\n".join(
         [
             re.sub(
@@ -1,4 +1,6 @@
-import json
+import collections
+import contextlib
+import copy
 import logging
 import os
 import time
@@ -17,13 +19,13 @@ except ImportError as e:
         raise e
 
 
-from typing import Any, Union
+from typing import Any, List, Optional, Union
 
 from telethon.tl.functions.channels import EditTitleRequest
 from telethon.tl.types import Message
 from telethon.errors.rpcerrorlist import ChannelsTooMuchError
 
-from . import utils, main
+from . import codec, utils, main
 
 DATA_DIR = (
     os.path.normpath(os.path.join(utils.get_base_dir(), ".."))
@@ -34,39 +36,88 @@ DATA_DIR = (
 logger = logging.getLogger(__name__)
 
 
+# Amount of kept revisions and minimal delay between them in seconds
+REVISIONS_LIMIT = 15
+REVISION_INTERVAL = 3
+
+# Amount of cached asset messages and maximum amount of ids per request
+ASSETS_CACHE_SIZE = 128
+ASSETS_BATCH_SIZE = 100
+# File references of media expire, so asset messages are re-fetched
+# after this amount of seconds
+ASSETS_CACHE_TTL = 30 * 60
+
+
 class NoAssetsChannel(Exception):
     """Raised when trying to read/store asset with no asset channel present"""
 
 
+class Revision:
+    """
+    Snapshot of database. Owners, which encode the same as in the previous
+    revision, share their data with it, so each revision costs only
+    the copies of changed owners. Snapshots must never be mutated
+    """
+
+    __slots__ = ("created", "data", "segments", "changed")
+
+    def __init__(self, created: float, data: dict, segments: dict, changed: list):
+        self.created = created
+        self.data = data
+        # Encoded owners, which snapshots were taken from
+        self.segments = segments
+        self.changed = changed
+
+    def materialize(self) -> dict:
+        """Get mutable copy of database at the moment of revision"""
+        return {owner: copy.deepcopy(value) for owner, value in self.data.items()}
+
+
 class Database(dict):
     _next_revision_call = 0
-    _revisions = []
     _assets = None
     _me = None
     _postgre = None
     _redis = None
     _saving_task = None
+    _save_handle = None
+    _loop = None
 
     def __init__(self, client):
         super().__init__()
         self._client = client
+        self._revisions = collections.deque(maxlen=REVISIONS_LIMIT)
+        self._assets_cache = collections.OrderedDict()
 
     def __repr__(self):
         return object.__repr__(self)
 
-    def _postgre_save_sync(self):
+    def serialize(self) -> bytes:
+        """
+        Encode database to JSON
+        :raises TypeError: If database is not JSON-serializable
+        """
+        return codec.join_segments(list(self.segments().values()))
+
+    def segments(self) -> dict:
+        """
+        Get encoded items of database (see `codec.encode_segment`) by owner
+        :raises TypeError: If database is not JSON-serializable
+        """
+        return {
+            owner: codec.encode_segment(owner, value) for owner, value in self.items()
+        }
+
+    def _postgre_save_sync(self, data: bytes):
         self._postgre.execute(
             "DELETE FROM hikka WHERE id = %s; INSERT INTO hikka (id, data) VALUES (%s, %s);",
-            (self._client._tg_id, self._client._tg_id, json.dumps(self)),
+            (self._client._tg_id, self._client._tg_id, data.decode("utf-8")),
         )
         self._postgre.connection.commit()
 
-    def _redis_save_sync(self):
+    def _redis_save_sync(self, data: bytes):
         with self._redis.pipeline() as pipe:
-            pipe.set(
-                str(self._client._tg_id),
-                json.dumps(self, ensure_ascii=True),
-            )
+            pipe.set(str(self._client._tg_id), data)
             pipe.execute()
 
     async def remote_force_save(self) -> bool:
@@ -75,10 +126,10 @@ class Database(dict):
             return False
 
         if self._redis:
-            await utils.run_sync(self._redis_save_sync)
+            await utils.run_sync(self._redis_save_sync, self.serialize())
             logger.debug("Published db to Redis")
         elif self._postgre:
-            await utils.run_sync(self._postgre_save_sync)
+            await utils.run_sync(self._postgre_save_sync, self.serialize())
             logger.debug("Published db to PostgreSQL")
 
         return True
@@ -90,7 +141,7 @@ class Database(dict):
 
         await asyncio.sleep(5)
 
-        await utils.run_sync(self._postgre_save_sync)
+        await utils.run_sync(self._postgre_save_sync, self.serialize())
 
         logger.debug("Published db to PostgreSQL")
 
@@ -104,7 +155,7 @@ class Database(dict):
 
         await asyncio.sleep(5)
 
-        await utils.run_sync(self._redis_save_sync)
+        await utils.run_sync(self._redis_save_sync, self.serialize())
 
         logger.debug("Published db to Redis")
 
@@ -137,6 +188,9 @@ class Database(dict):
 
     async def init(self):
         """Asynchronous initialization unit"""
+        # Saves can be scheduled from other threads (e.g. `utils.run_sync`)
+        self._loop = asyncio.get_event_loop()
+
         if os.environ.get("REDIS_URL") or main.get_config_key("redis_uri"):
             await self.redis_init()
         elif os.environ.get("DATABASE_URL") or main.get_config_key("postgre_uri"):
@@ -168,7 +222,7 @@ class Database(dict):
         if self._redis:
             try:
                 self.update(
-                    **json.loads(
+                    **codec.loads(
                         self._redis.get(
                             str(self._client._tg_id),
                         ).decode(),
@@ -184,7 +238,7 @@ class Database(dict):
                     (self._client._tg_id,),
                 )
                 self.update(
-                    **json.loads(
+                    **codec.loads(
                         self._postgre.fetchall()[0][0],
                     ),
                 )
@@ -193,14 +247,14 @@ class Database(dict):
             return
 
         try:
-            with open(self._db_path, "r", encoding="utf-8") as f:
-                data = json.loads(f.read())
+            with open(self._db_path, "rb") as f:
+                data = codec.loads(f.read())
                 self.update(**data)
-        except (FileNotFoundError, json.decoder.JSONDecodeError):
+        except (FileNotFoundError, ValueError):
             logger.warning("Database read failed! Creating new one...")
 
-    def process_db_autofix(self, db: dict) -> bool:
-        if not utils.is_serializable(db):
+    def process_db_autofix(self, db: dict, check_serializable: bool = True) -> bool:
+        if check_serializable and not codec.is_serializable(db):
             return False
 
         for key, value in db.copy().items():
@@ -219,7 +273,7 @@ class Database(dict):
                 )
                 continue
 
-            for subkey in value:
+            for subkey in list(value):
                 if not isinstance(subkey, (str, int)):
                     del db[key][subkey]
                     logger.warning(
@@ -231,11 +285,17 @@ class Database(dict):
 
     def save(self) -> bool:
         """Save database"""
-        if not self.process_db_autofix(self):
+        segments = None
+        if self.process_db_autofix(self, check_serializable=False):
+            # Database is validated and encoded in a single pass
+            with contextlib.suppress(*codec.EncodeError):
+                segments = self.segments()
+
+        if segments is None:
             try:
-                rev = self._revisions.pop()
+                rev = self._revisions.pop().materialize()
                 while not self.process_db_autofix(rev):
-                    rev = self._revisions.pop()
+                    rev = self._revisions.pop().materialize()
             except IndexError:
                 raise RuntimeError(
                     "Can't find revision to restore broken database from "
@@ -243,20 +303,18 @@ class Database(dict):
                     "so its save is forbidden."
                 )
 
-            self.clear()
-            self.update(**rev)
+            self._replace(rev)
 
             raise RuntimeError(
                 "Rewriting database to the last revision "
                 "because new one destructed it"
             )
 
-        if self._next_revision_call < time.time():
-            self._revisions += [dict(self)]
-            self._next_revision_call = time.time() + 3
+        data = codec.join_segments(list(segments.values()))
 
-        while len(self._revisions) > 15:
-            self._revisions.pop()
+        if self._next_revision_call < time.time():
+            self._make_revision(segments)
+            self._next_revision_call = time.time() + REVISION_INTERVAL
 
         if self._redis:
             if not self._saving_task:
@@ -268,14 +326,78 @@ class Database(dict):
             return True
 
         try:
-            with open(self._db_path, "w", encoding="utf-8") as f:
-                f.write(json.dumps(self))
+            with open(self._db_path, "wb") as f:
+                f.write(data)
         except Exception:
             logger.exception("Database save failed!")
             return False
 
         return True
 
+    def _make_revision(self, segments: dict):
+        # Values can be changed in place without any notice, so owners
+        # are compared by their encoded content, rather than by accesses
+        previous = self._revisions[-1] if self._revisions else None
+        data = {}
+        changed = []
+
+        for owner, value in self.items():
+            if previous is not None and previous.segments.get(owner) == segments[owner]:
+                data[owner] = previous.data[owner]
+            else:
+                data[owner] = copy.deepcopy(value)
+                changed += [owner]
+
+        if previous is not None:
+            changed += [owner for owner in previous.data if owner not in self]
+
+        self._revisions.append(Revision(time.time(), data, segments, changed))
+
+    def _replace(self, data: dict):
+        self.clear()
+        self.update(**data)
+
+    @property
+    def revisions(self) -> list:
+        """Saved revisions, the newest one first"""
+        return list(reversed(self._revisions))
+
+    def rollback(self, index: int) -> bool:
+        """
+        Restore database from revision
+        :param index: Index of revision in `revisions` (0 is the newest one)
+        :return: `False`, if there is no such revision or it is broken
+        """
+        try:
+            rev = self.revisions[index].materialize()
+        except IndexError:
+            return False
+
+        if not self.process_db_autofix(rev):
+            return False
+
+        self._replace(rev)
+        self.save()
+        return True
+
+    def schedule_save(self, delay: float = 0.5):
+        """
+        Save database a bit later. All changes, made in the meantime,
+        are written at once. Can be called from any thread
+        """
+        self._loop.call_soon_threadsafe(self._arm_save, delay)
+
+    def _arm_save(self, delay: float):
+        if self._save_handle is None:
+            self._save_handle = self._loop.call_later(delay, self._scheduled_save)
+
+    def _scheduled_save(self):
+        self._save_handle = None
+        try:
+            self.save()
+        except Exception:
+            logger.exception("Scheduled database save failed!")
+
     async def store_asset(self, message: Message) -> int:
         """
         Save assets
@@ -284,31 +406,75 @@ class Database(dict):
         if not self._assets:
             raise NoAssetsChannel("Tried to save asset to non-existing asset channel")
 
-        return (
-            (await self._client.send_message(self._assets, message)).id
+        asset = (
+            await self._client.send_message(self._assets, message)
             if isinstance(message, Message)
-            else (
-                await self._client.send_message(
-                    self._assets,
-                    file=message,
-                    force_document=True,
-                )
-            ).id
+            else await self._client.send_message(
+                self._assets,
+                file=message,
+                force_document=True,
+            )
         )
 
-    async def fetch_asset(self, asset_id: int) -> Union[None, Message]:
-        """Fetch previously saved asset by its asset_id"""
+        self._cache_asset(asset.id, asset)
+        return asset.id
+
+    def _cache_asset(self, asset_id: int, asset: Optional[Message]):
+        if asset is None:
+            # Asset can be missing temporarily, so it's requested again next time
+            self._assets_cache.pop(asset_id, None)
+            return
+
+        self._assets_cache[asset_id] = (time.monotonic() + ASSETS_CACHE_TTL, asset)
+        self._assets_cache.move_to_end(asset_id)
+        while len(self._assets_cache) > ASSETS_CACHE_SIZE:
+            self._assets_cache.popitem(last=False)
+
+    def _get_cached_asset(self, asset_id: int) -> Optional[Message]:
+        if asset_id not in self._assets_cache:
+            return None
+
+        expires, asset = self._assets_cache[asset_id]
+        if expires < time.monotonic():
+            del self._assets_cache[asset_id]
+            return None
+
+        self._assets_cache.move_to_end(asset_id)
+        return asset
+
+    async def fetch_assets(self, asset_ids: List[int]) -> List[Optional[Message]]:
+        """
+        Fetch previously saved assets by their asset_ids
+        Assets, which are not cached, are requested in batches
+        :return: List of assets in the same order. Missing ones are `None`
+        """
         if not self._assets:
             raise NoAssetsChannel(
                 "Tried to fetch asset from non-existing asset channel"
             )
 
-        asset = await self._client.get_messages(self._assets, ids=[asset_id])
+        missing = [
+            asset_id
+            for asset_id in dict.fromkeys(asset_ids)
+            if self._get_cached_asset(asset_id) is None
+        ]
 
-        if not asset:
-            return None
+        fetched = {}
+        for chunk in utils.chunks(missing, ASSETS_BATCH_SIZE):
+            assets = await self._client.get_messages(self._assets, ids=chunk)
+            fetched.update(zip(chunk, assets))
+
+        for asset_id, asset in fetched.items():
+            self._cache_asset(asset_id, asset)
 
-        return asset[0]
+        return [
+            fetched.get(asset_id) or self._get_cached_asset(asset_id)
+            for asset_id in asset_ids
+        ]
+
+    async def fetch_asset(self, asset_id: int) -> Union[None, Message]:
+        """Fetch previously saved asset by its asset_id"""
+        return (await self.fetch_assets([asset_id]))[0]
 
     def get(self, owner: str, key: str, default: Any = None) -> Any:
         """Get database key"""
@@ -319,26 +485,31 @@ class Database(dict):
 
     def set(self, owner: str, key: str, value: Any) -> bool:
         """Set database key"""
-        if not utils.is_serializable(owner):
+        if not codec.is_serializable([owner, key, value]):
+            self._raise_not_serializable(owner, key, value)
+
+        self.setdefault(owner, {})[key] = value
+        return self.save()
+
+    @staticmethod
+    def _raise_not_serializable(owner: str, key: str, value: Any):
+        if not codec.is_serializable(owner):
             raise RuntimeError(
                 "Attempted to write object to "
                 f"{owner=} ({type(owner)=}) of database. It is not "
                 "JSON-serializable key which will cause errors"
             )
 
-        if not utils.is_serializable(key):
+        if not codec.is_serializable(key):
             raise RuntimeError(
                 "Attempted to write object to "
                 f"{key=} ({type(key)=}) of database. It is not "
                 "JSON-serializable key which will cause errors"
             )
 
-        if not utils.is_serializable(value):
+        if not codec.is_serializable(value):
             raise RuntimeError(
                 "Attempted to write object of "
                 f"{key=} ({type(value)=}) to database. It is not "
                 "JSON-serializable value which will cause errors"
             )
-
-        super().setdefault(owner, {})[key] = value
-        return self.save()
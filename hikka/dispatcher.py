@@ -38,7 +38,7 @@ from typing import Tuple, Union
 from telethon import types
 from telethon.tl.types import Message
 
-from . import main, security, utils
+from . import main, rpc, security, utils
 from .database import Database
 from .loader import Modules
 
@@ -463,6 +463,10 @@ class CommandDispatcher:
         # parsed via inspect.stack()
         _hikka_client_id_logging_tag = copy.copy(self.client._tg_id)  # skipcq
         try:
-            await func(message)
+            with self._modules.stats.measure(
+                "command" if exception_handler == self.command_exc else "watcher",
+                func,
+            ), rpc.handler_context(func):
+                await func(message)
         except BaseException as e:
             await exception_handler(e, message, *args)
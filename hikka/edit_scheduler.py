@@ -0,0 +1,200 @@
+"""Coalesces rapid edits of the same message and paces them per chat"""
+
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Hashable
+
+from aiogram.utils.exceptions import MessageNotModified, RetryAfter
+from telethon.errors.rpcerrorlist import FloodWaitError, MessageNotModifiedError
+from telethon.tl.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Minimal delay between two edits in one chat. Telegram allows
+# about one message per second in private chats and 20 per minute in groups
+PRIVATE_INTERVAL = 1.0
+GROUP_INTERVAL = 3.0
+INLINE_INTERVAL = 1.0
+
+
+class _PendingEdit:
+    __slots__ = ("chat", "factory", "futures")
+
+    def __init__(
+        self,
+        chat: Hashable,
+        factory: Callable[[], Awaitable],
+        future: asyncio.Future,
+    ):
+        self.chat = chat
+        self.factory = factory
+        self.futures = [future]
+
+
+def _consume(future: asyncio.Future):
+    # Most of callers don't wait for the result, so exceptions
+    # must be retrieved here to avoid warnings
+    if not future.cancelled() and future.exception() is not None:
+        logger.debug("Scheduled edit failed", exc_info=future.exception())
+
+
+class EditScheduler:
+    """
+    Keeps only the latest pending edit of each message ("latest wins")
+    and sends them one by one with respect to per-chat limits
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._queues = {}
+        self._workers = {}
+        self._next = {}
+
+    def schedule(
+        self,
+        key: Hashable,
+        chat: Hashable,
+        factory: Callable[[], Awaitable],
+        interval: float,
+    ) -> asyncio.Future:
+        """
+        Schedule an edit
+        :param key: Identifier of message
+        :param chat: Identifier of chat, where edits are paced
+        :param factory: Function, returning coroutine, which performs the edit
+        :param interval: Minimal delay between edits in this chat
+        :return: Future, which will be resolved with the result of the latest edit
+        """
+        future = asyncio.get_event_loop().create_future()
+        future.add_done_callback(_consume)
+
+        if key in self._pending:
+            self._pending[key].factory = factory
+            self._pending[key].futures += [future]
+        else:
+            self._pending[key] = _PendingEdit(chat, factory, future)
+            self._queues.setdefault(chat, []).append(key)
+
+        if chat not in self._workers:
+            self._workers[chat] = asyncio.ensure_future(self._worker(chat, interval))
+
+        return future
+
+    def cancel(self, key: Hashable):
+        """Drop pending edit, e.g. because the message is being edited directly"""
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+
+        if key in self._queues.get(pending.chat, []):
+            self._queues[pending.chat].remove(key)
+
+        for future in pending.futures:
+            if not future.done():
+                future.set_result(None)
+
+    async def _worker(self, chat: Hashable, interval: float):
+        try:
+            while self._queues.get(chat):
+                delay = self._next.get(chat, 0) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if not self._queues.get(chat):
+                    break
+
+                key = self._queues[chat].pop(0)
+                pending = self._pending.pop(key)
+
+                try:
+                    result = await pending.factory()
+                except (MessageNotModifiedError, MessageNotModified):
+                    result = None
+                except (FloodWaitError, RetryAfter) as e:
+                    seconds = getattr(e, "seconds", None) or getattr(e, "timeout", 0)
+                    logger.debug(f"Edits in {chat} are delayed for {seconds}s")
+                    self._next[chat] = time.monotonic() + seconds
+
+                    if key in self._pending:
+                        # Newer edit was scheduled, while we were sending
+                        # this one, so it must resolve our futures as well
+                        self._pending[key].futures += pending.futures
+                    else:
+                        self._pending[key] = pending
+                        self._queues[chat].insert(0, key)
+
+                    continue
+                except Exception as e:
+                    self._next[chat] = time.monotonic() + interval
+                    for future in pending.futures:
+                        if not future.done():
+                            future.set_exception(e)
+
+                    continue
+
+                self._next[chat] = time.monotonic() + interval
+                for future in pending.futures:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._workers.pop(chat, None)
+            if not self._queues.get(chat):
+                self._queues.pop(chat, None)
+
+            if self._next.get(chat, 0) <= time.monotonic():
+                self._next.pop(chat, None)
+
+    def edit(self, message: Message, *args, **kwargs) -> asyncio.Future:
+        """
+        Schedule the edit of telethon message
+        Arguments are the same as for `message.edit`
+        """
+        chat = (id(message.client), message.chat_id)
+        return self.schedule(
+            (*chat, message.id),
+            chat,
+            lambda: message.edit(*args, **kwargs),
+            PRIVATE_INTERVAL if message.is_private else GROUP_INTERVAL,
+        )
+
+    @staticmethod
+    def _inline_key(message: "InlineMessage") -> tuple:  # type: ignore
+        return ("inline", message.inline_message_id or message.unit_id)
+
+    def edit_inline(
+        self,
+        message: "InlineMessage",  # type: ignore
+        *args,
+        **kwargs,
+    ) -> asyncio.Future:
+        """
+        Schedule the edit of inline message (form, gallery, list etc.)
+        Arguments are the same as for `message.edit`
+        """
+        key = self._inline_key(message)
+        return self.schedule(
+            key,
+            key,
+            lambda: message.edit(*args, **kwargs),
+            INLINE_INTERVAL,
+        )
+
+    def cancel_message(self, message: Message):
+        self.cancel((id(message.client), message.chat_id, message.id))
+
+    def cancel_inline(self, message: "InlineMessage"):  # type: ignore
+        self.cancel(self._inline_key(message))
+
+
+scheduler = EditScheduler()
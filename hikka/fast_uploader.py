@@ -21,7 +21,6 @@ from typing import (
     Union,
 )
 
-import time
 
 from telethon import TelegramClient, helpers, utils
 from telethon.crypto import AuthKey
@@ -482,18 +481,19 @@ async def download_file(
     downloader = ParallelTransferrer(_client, dc_id)
     downloaded = downloader.download(location, size)
 
-    ratelimiter = time.time() + 3
-
     if progress_callback is None and message_object is not None:
+        last_percentage = None
 
         async def default_progress_callback(current: int, total: int):
-            nonlocal message_object, ratelimiter
-            if ratelimiter > time.time():
+            nonlocal message_object, last_percentage
+            percentage = round(current * 100 / total)
+            if percentage == last_percentage:
                 return
 
-            ratelimiter = time.time() + 3
+            last_percentage = percentage
 
-            percentage = round(current * 100 / total)
+            # Edits are coalesced, so only the latest progress state
+            # will be sent, when chat's rate limit allows it
             try:
                 message_object = await answer(
                     message_object,
@@ -501,6 +501,7 @@ async def download_file(
                         "🌘 <b>Hikka is downloading a file...</b>\n"
                         f"<code>{_progressbar(percentage)} {percentage}%</code>"
                     ),
+                    coalesce=True,
                 )
             except Exception:
                 pass
@@ -518,6 +519,8 @@ async def download_file(
 
     if message_object is not None:
         try:
+            # Final state is not coalesced, so pending progress edit is
+            # dropped and can't overwrite further edits of caller
             message_object = await answer(
                 message_object,
                 "🌘 <b>File ready, processing...</b>",
@@ -554,18 +557,19 @@ async def upload_file(
     if len(file.getvalue()) < 1024 * 1024:
         return await _client.upload_file(file, file_name=filename)
 
-    ratelimiter = time.time() + 3
-
     if progress_callback is None and message_object is not None:
+        last_percentage = None
 
         async def default_progress_callback(current: int, total: int):
-            nonlocal message_object, ratelimiter
-            if ratelimiter > time.time():
+            nonlocal message_object, last_percentage
+            percentage = round(current * 100 / total)
+            if percentage == last_percentage:
                 return
 
-            ratelimiter = time.time() + 3
+            last_percentage = percentage
 
-            percentage = round(current * 100 / total)
+            # Edits are coalesced, so only the latest progress state
+            # will be sent, when chat's rate limit allows it
             try:
                 message_object = await answer(
                     message_object,
@@ -573,6 +577,7 @@ async def upload_file(
                         "🌘 <b>Hikka is uploading a file...</b>\n"
                         f"<code>{_progressbar(percentage)} {percentage}%</code>"
                     ),
+                    coalesce=True,
                 )
             except Exception:
                 pass
@@ -590,6 +595,8 @@ async def upload_file(
 
     if message_object is not None:
         try:
+            # Final state is not coalesced, so pending progress edit is
+            # dropped and can't overwrite further edits of caller
             message_object = await answer(
                 message_object,
                 "🌘 <b>File ready, processing...</b>",
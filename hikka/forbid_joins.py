@@ -1,10 +1,10 @@
 from telethon import TelegramClient
-from telethon.utils import is_list_like
+from telethon.tl.functions.channels import JoinChannelRequest
 
-import inspect
 import logging
+from typing import Optional
 
-from . import loader
+from . import rpc
 
 logger = logging.getLogger(__name__)
 
@@ -17,56 +17,31 @@ logger = logging.getLogger(__name__)
 # Thank you
 
 
-def install_join_forbidder(client: TelegramClient) -> TelegramClient:
-    if hasattr(client, "_forbid_join_tag"):
-        return client
-
-    old_call = client._call
-
-    async def new_call(
-        sender: "MTProtoSender",  # type: ignore
-        request: "TLRequest",  # type: ignore
-        ordered: bool = False,
-        flood_sleep_threshold: int = None,
-    ):
-        not_tuple = False
-        if not is_list_like(request):
-            not_tuple = True
-            request = (request,)
-
-        new_request = []
+async def _forbid_join(
+    client: TelegramClient,
+    request: JoinChannelRequest,
+) -> Optional[JoinChannelRequest]:
+    caller = rpc.get_caller(ignore={"APIRatelimiterMod", "ForbidJoinMod"})
+    if caller is None or caller.__class__.__name__ not in {"HelpMod", "LoaderMod"}:
+        logger.debug(
+            f"🎉 I protected you from unintented JoinChannelRequest ({request})!"
+        )
+        return None
 
-        for item in request:
-            if item.CONSTRUCTOR_ID == 615851205:
-                if next(
-                    frame_info.frame.f_locals["self"]
-                    for frame_info in inspect.stack()
-                    if hasattr(frame_info, "frame")
-                    and hasattr(frame_info.frame, "f_locals")
-                    and isinstance(frame_info.frame.f_locals, dict)
-                    and "self" in frame_info.frame.f_locals
-                    and isinstance(frame_info.frame.f_locals["self"], loader.Module)
-                    and frame_info.frame.f_locals["self"].__class__.__name__
-                    not in {"APIRatelimiterMod", "ForbidJoinMod"}
-                ).__class__.__name__ not in {"HelpMod", "LoaderMod"}:
-                    logger.debug(
-                        f"🎉 I protected you from unintented JoinChannelRequest ({item})!"
-                    )
-                    continue
+    return request
 
-            new_request += [item]
 
-        if not new_request:
-            return
+def install_join_forbidder(client: TelegramClient) -> TelegramClient:
+    if getattr(client, "_joins_forbidden", False):
+        return client
 
-        return await old_call(
-            sender,
-            new_request[0] if not_tuple else tuple(new_request),
-            ordered,
-            flood_sleep_threshold,
+    rpc.get_chain(client).add(
+        rpc.Middleware(
+            "JoinForbidder",
+            pre=_forbid_join,
+            constructors={JoinChannelRequest.CONSTRUCTOR_ID},
         )
-
-    client._call = new_call
+    )
     client._joins_forbidden = True
     logger.debug("🎉 JoinForbidder installed!")
     return client
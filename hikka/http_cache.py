@@ -0,0 +1,259 @@
+"""Shared HTTP client with on-disk cache and conditional revalidation"""
+
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import asyncio
+import collections
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+import aiohttp
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = (
+    os.path.join(
+        os.path.normpath(os.path.join(utils.get_base_dir(), "..")),
+        ".http_cache",
+    )
+    if "OKTETO" not in os.environ and "DOCKER" not in os.environ
+    else "/data/.http_cache"
+)
+
+# Maximum amount of simultaneous requests
+CONCURRENCY = 8
+TIMEOUT = 30
+# Maximum amount of responses, kept in memory for `max_age` reuse
+FRESH_SIZE = 128
+
+
+class HTTPError(aiohttp.ClientError):
+    """Resource responded with unsuccessful status"""
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"Can't fetch {url}: HTTP {status}")
+        self.url = url
+        self.status = status
+
+
+class Response:
+    """Result of `CachedFetcher.get`"""
+
+    __slots__ = ("url", "status", "content", "cached")
+
+    def __init__(self, url: str, status: int, content: bytes, cached: bool):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.cached = cached
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise HTTPError(self.url, self.status)
+
+    def __repr__(self):
+        return f"<Response [{self.status}] {self.url} cached={self.cached}>"
+
+
+class CachedFetcher:
+    """
+    Fetches resources through one connection pool. Bodies are stored on disk
+    along with their `ETag` and `Last-Modified`, so the next request of the same
+    resource is conditional, and unchanged ones are read from cache
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = CACHE_DIR,
+        concurrency: int = CONCURRENCY,
+    ):
+        """
+        :param cache_dir: Directory for cached responses. Only memory is used, if `None`
+        :param concurrency: Maximum amount of simultaneous requests
+        """
+        self.cache_dir = cache_dir if "DYNO" not in os.environ else None
+        self._concurrency = concurrency
+        self._session = None
+        self._semaphore = None
+        self._inflight = {}
+        self._fresh = collections.OrderedDict()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._concurrency),
+                timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+            )
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+
+        return self._session
+
+    def _path(self, url: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+
+        return os.path.join(
+            self.cache_dir,
+            hashlib.sha256(url.encode("utf-8")).hexdigest(),
+        )
+
+    def _read_cache(self, url: str) -> Optional[tuple]:
+        path = self._path(url)
+        if path is None:
+            return None
+
+        try:
+            with open(f"{path}.json", "r") as meta, open(path, "rb") as body:
+                return json.load(meta), body.read()
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, url: str, headers: dict, content: bytes):
+        path = self._path(url)
+        if path is None:
+            return
+
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+
+        if not meta["etag"] and not meta["last_modified"]:
+            # Response can't be revalidated, so there is no point in storing it
+            return
+
+        try:
+            os.makedirs(self.cache_dir, mode=0o755, exist_ok=True)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(content)
+
+            os.replace(f"{path}.tmp", path)
+
+            with open(f"{path}.json", "w") as f:
+                json.dump(meta, f)
+        except OSError:
+            logger.debug(f"Can't cache {url}", exc_info=True)
+
+    async def _fetch(self, url: str) -> Response:
+        session = self._get_session()
+        cached = await utils.run_sync(self._read_cache, url)
+        headers = {}
+        if cached is not None:
+            meta, _ = cached
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            async with self._semaphore:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and cached is not None:
+                        logger.debug(f"{url} is not modified, using cache")
+                        return Response(url, 200, cached[1], True)
+
+                    content = await response.read()
+                    if 200 <= response.status < 300:
+                        await utils.run_sync(
+                            self._write_cache,
+                            url,
+                            response.headers.copy(),
+                            content,
+                        )
+
+                    return Response(url, response.status, content, False)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if cached is None:
+                raise
+
+            logger.debug(f"Can't fetch {url}, using cache", exc_info=True)
+            return Response(url, 200, cached[1], True)
+
+    async def get(self, url: str, max_age: int = 0) -> Response:
+        """
+        Fetch resource
+        :param url: URL of resource
+        :param max_age: Reuse the response, if it was received less than
+            this amount of seconds ago, without revalidating it
+        """
+        if max_age and url in self._fresh:
+            received, response = self._fresh[url]
+            if time.monotonic() - received < max_age:
+                self._fresh.move_to_end(url)
+                return response
+
+        if url not in self._inflight:
+            self._inflight[url] = asyncio.ensure_future(self._fetch(url))
+
+        try:
+            response = await asyncio.shield(self._inflight[url])
+        finally:
+            if url in self._inflight and self._inflight[url].done():
+                del self._inflight[url]
+
+        self._fresh[url] = (time.monotonic(), response)
+        self._fresh.move_to_end(url)
+        while len(self._fresh) > FRESH_SIZE:
+            self._fresh.popitem(last=False)
+
+        return response
+
+    async def get_many(self, urls: Iterable[str]) -> Dict[str, Response]:
+        """
+        Fetch multiple resources concurrently
+        :return: Mapping of URL to response. Failed ones are omitted
+        """
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(
+            *[self.get(url) for url in urls],
+            return_exceptions=True,
+        )
+
+        responses = {}
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                logger.debug(f"Can't prefetch {url}: {result}")
+                continue
+
+            responses[url] = result
+
+        return responses
+
+    def forget(self):
+        """Drop in-memory responses, so the next requests are revalidated"""
+        self._fresh.clear()
+
+    async def close(self):
+        if self._session is not None:
+            with contextlib.suppress(Exception):
+                await self._session.close()
+
+            self._session = None
+
+
+fetcher = CachedFetcher()
@@ -11,6 +11,7 @@
 # 🌐 https://www.gnu.org/licenses/agpl-3.0.html
 
 import asyncio
+import collections
 import logging
 import time
 
@@ -25,11 +26,13 @@ from ..database import Database
 from .bot_pm import BotPM
 from .events import Events
 from .form import Form
-from .gallery import Gallery
+from .gallery import PREFETCH_CONCURRENCY, Gallery
 from .list import List
 from .query_gallery import QueryGallery
+from .store import UnitStore
 from .token_obtainment import TokenObtainment
 from .utils import Utils
+from .webhook import Webhook
 
 logger = logging.getLogger(__name__)
 
@@ -43,10 +46,8 @@ class InlineManager(
     QueryGallery,
     List,
     BotPM,
+    Webhook,
 ):
-    _units = {}
-    _custom_map = {}
-
     fsm = {}
 
     _web_auth_tokens = []
@@ -66,8 +67,26 @@ class InlineManager(
         self._db = db
         self._allmodules = allmodules
 
+        # Units and callbacks are stored per manager, so
+        # clients don't look through each other's forms
+        self._units = UnitStore()
+        self._custom_map = {}
+
+        # Results of inline handlers, decorated with `loader.inline_cache`
+        self._inline_results = collections.OrderedDict()
+        self._inline_debounce = {}
+
+        # Galleries' prefetch limit, media cache and active slideshows
+        self._gallery_semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+        self._gallery_media = collections.OrderedDict()
+        self._slideshows = {}
+        self._slideshow_task = None
+
         self._token = db.get("hikka.inline", "bot_token", False)
 
+        # Chats, where bot failed to send units directly
+        self._direct_forbidden = set()
+
     async def _cleaner(self):
         """Cleans outdated inline units"""
         while True:
@@ -176,15 +195,15 @@ class InlineManager(
 
         self.bot.get_updates = new
 
-        # Start polling as the separate task, just in case we will need
-        # to force stop this coro. It should be cancelled only by `stop`
+        # Start receiving updates as the separate task, just in case we will
+        # need to force stop this coro. It should be cancelled only by `stop`
         # because it stops the bot from getting updates
-        self._task = asyncio.ensure_future(self._dp.start_polling())
+        self._task = asyncio.ensure_future(self._receive_updates())
         self._cleaner_task = asyncio.ensure_future(self._cleaner())
 
     async def _stop(self):
         self._task.cancel()
-        self._dp.stop_polling()
+        self._stop_receiving_updates()
         self._cleaner_task.cancel()
 
     def pop_web_auth_token(self, token) -> bool:
@@ -1,9 +1,11 @@
+import asyncio
 import functools
 import inspect
 import logging
 import re
+import time
 from asyncio import Event
-from typing import List
+from typing import List, Optional
 
 from aiogram.types import CallbackQuery, ChosenInlineResult
 from aiogram.types import InlineQuery as AiogramInlineQuery
@@ -17,11 +19,14 @@ from aiogram.types import (
 )
 from aiogram.types import Message as AiogramMessage
 
-from .. import utils
+from .. import rpc, utils
 from .types import InlineCall, InlineQuery, InlineUnit
 
 logger = logging.getLogger(__name__)
 
+# Maximum amount of cached results of inline handlers
+INLINE_CACHE_SIZE = 256
+
 
 class Events(InlineUnit):
     async def _message_handler(self, message: AiogramMessage):
@@ -66,117 +71,40 @@ class Events(InlineUnit):
                 user=inline_query.from_user.id,
             )
         ):
-            instance = InlineQuery(inline_query)
-
-            try:
-                result = await self._allmodules.inline_handlers[cmd](instance)
-            except BaseException:
-                logger.exception("Error on running inline watcher!")
-                return
-
-            if not result:
-                return
-
-            if isinstance(result, dict):
-                result = [result]
-
-            if not isinstance(result, list):
-                logger.error(
-                    f"Got invalid type from inline handler. It must be `dict`, got `{type(result)}`"
-                )
-                await instance.e500()
-                return
+            handler = self._allmodules.inline_handlers[cmd]
+            options = getattr(handler, "inline_cache", None)
+            cache_key = (cmd, " ".join(query.split()), inline_query.from_user.id)
+
+            inline_result = self._get_inline_results(cache_key) if options else None
+            if inline_result is None:
+                if options and not await self._debounce_inline(
+                    (cmd, inline_query.from_user.id),
+                    options["debounce"],
+                ):
+                    return
 
-            for res in result:
-                mandatory = {"message", "photo", "gif", "video", "file"}
-                if not any(item in res for item in mandatory):
-                    logger.error(
-                        f"Got invalid type from inline handler. It must contain one of `{mandatory}`"
-                    )
-                    await instance.e500()
+                inline_result = await self._run_inline_handler(handler, inline_query)
+                if inline_result is None:
                     return
 
-                if "file" in res and "mime_type" not in res:
-                    logger.error(
-                        f"Got invalid type from inline handler. It contains field `file`, so it must contain `mime_type` as well"
+                if options:
+                    self._cache_inline_results(
+                        cache_key,
+                        inline_result,
+                        options["ttl"],
                     )
 
-            inline_result = []
-
-            for res in result:
-                if "message" in res:
-                    inline_result += [
-                        InlineQueryResultArticle(
-                            id=utils.rand(20),
-                            title=res["title"],
-                            description=res.get("description"),
-                            input_message_content=InputTextMessageContent(
-                                res["message"],
-                                "HTML",
-                                disable_web_page_preview=True,
-                            ),
-                            thumb_url=res.get("thumb"),
-                            thumb_width=128,
-                            thumb_height=128,
-                            reply_markup=self.generate_markup(res.get("reply_markup")),
-                        )
-                    ]
-                elif "photo" in res:
-                    inline_result += [
-                        InlineQueryResultPhoto(
-                            id=utils.rand(20),
-                            title=res.get("title"),
-                            description=res.get("description"),
-                            caption=res.get("caption"),
-                            parse_mode="HTML",
-                            thumb_url=res.get("thumb", res["photo"]),
-                            photo_url=res["photo"],
-                            reply_markup=self.generate_markup(res.get("reply_markup")),
-                        )
-                    ]
-                elif "gif" in res:
-                    inline_result += [
-                        InlineQueryResultGif(
-                            id=utils.rand(20),
-                            title=res.get("title"),
-                            caption=res.get("caption"),
-                            parse_mode="HTML",
-                            thumb_url=res.get("thumb", res["gif"]),
-                            gif_url=res["gif"],
-                            reply_markup=self.generate_markup(res.get("reply_markup")),
-                        )
-                    ]
-                elif "video" in res:
-                    inline_result += [
-                        InlineQueryResultVideo(
-                            id=utils.rand(20),
-                            title=res.get("title"),
-                            description=res.get("description"),
-                            caption=res.get("caption"),
-                            parse_mode="HTML",
-                            thumb_url=res.get("thumb", res["video"]),
-                            video_url=res["video"],
-                            mime_type="video/mp4",
-                            reply_markup=self.generate_markup(res.get("reply_markup")),
-                        )
-                    ]
-                elif "file" in res:
-                    inline_result += [
-                        InlineQueryResultDocument(
-                            id=utils.rand(20),
-                            title=res.get("title"),
-                            description=res.get("description"),
-                            caption=res.get("caption"),
-                            parse_mode="HTML",
-                            thumb_url=res.get("thumb", res["file"]),
-                            document_url=res["file"],
-                            mime_type=res["mime_type"],
-                            reply_markup=self.generate_markup(res.get("reply_markup")),
-                        )
-                    ]
-
             try:
-                await inline_query.answer(inline_result, cache_time=0)
+                await inline_query.answer(
+                    inline_result,
+                    **(
+                        # Results may depend on user, so Telegram
+                        # must not share them between users
+                        {"cache_time": options["ttl"], "is_personal": True}
+                        if options
+                        else {"cache_time": 0}
+                    ),
+                )
             except Exception:
                 logger.exception(
                     f"Exception when answering inline query with result from {cmd}"
@@ -187,6 +115,166 @@ class Events(InlineUnit):
         await self._gallery_inline_handler(inline_query)
         await self._list_inline_handler(inline_query)
 
+    async def _run_inline_handler(
+        self,
+        handler: callable,
+        inline_query: AiogramInlineQuery,
+    ) -> Optional[list]:
+        """
+        Run module's inline handler and build results for the query
+        :return: List of results or `None`, if there is nothing to answer with
+        """
+        instance = InlineQuery(inline_query)
+
+        try:
+            with self._allmodules.stats.measure(
+                "inline",
+                handler,
+            ), rpc.handler_context(handler):
+                result = await handler(instance)
+        except BaseException:
+            logger.exception("Error on running inline watcher!")
+            return None
+
+        if not result:
+            return None
+
+        if isinstance(result, dict):
+            result = [result]
+
+        if not isinstance(result, list):
+            logger.error(
+                f"Got invalid type from inline handler. It must be `dict`, got `{type(result)}`"
+            )
+            await instance.e500()
+            return None
+
+        for res in result:
+            mandatory = {"message", "photo", "gif", "video", "file"}
+            if not any(item in res for item in mandatory):
+                logger.error(
+                    f"Got invalid type from inline handler. It must contain one of `{mandatory}`"
+                )
+                await instance.e500()
+                return None
+
+            if "file" in res and "mime_type" not in res:
+                logger.error(
+                    f"Got invalid type from inline handler. It contains field `file`, so it must contain `mime_type` as well"
+                )
+
+        inline_result = []
+
+        for res in result:
+            if "message" in res:
+                inline_result += [
+                    InlineQueryResultArticle(
+                        id=utils.rand(20),
+                        title=res["title"],
+                        description=res.get("description"),
+                        input_message_content=InputTextMessageContent(
+                            res["message"],
+                            "HTML",
+                            disable_web_page_preview=True,
+                        ),
+                        thumb_url=res.get("thumb"),
+                        thumb_width=128,
+                        thumb_height=128,
+                        reply_markup=self.generate_markup(res.get("reply_markup")),
+                    )
+                ]
+            elif "photo" in res:
+                inline_result += [
+                    InlineQueryResultPhoto(
+                        id=utils.rand(20),
+                        title=res.get("title"),
+                        description=res.get("description"),
+                        caption=res.get("caption"),
+                        parse_mode="HTML",
+                        thumb_url=res.get("thumb", res["photo"]),
+                        photo_url=res["photo"],
+                        reply_markup=self.generate_markup(res.get("reply_markup")),
+                    )
+                ]
+            elif "gif" in res:
+                inline_result += [
+                    InlineQueryResultGif(
+                        id=utils.rand(20),
+                        title=res.get("title"),
+                        caption=res.get("caption"),
+                        parse_mode="HTML",
+                        thumb_url=res.get("thumb", res["gif"]),
+                        gif_url=res["gif"],
+                        reply_markup=self.generate_markup(res.get("reply_markup")),
+                    )
+                ]
+            elif "video" in res:
+                inline_result += [
+                    InlineQueryResultVideo(
+                        id=utils.rand(20),
+                        title=res.get("title"),
+                        description=res.get("description"),
+                        caption=res.get("caption"),
+                        parse_mode="HTML",
+                        thumb_url=res.get("thumb", res["video"]),
+                        video_url=res["video"],
+                        mime_type="video/mp4",
+                        reply_markup=self.generate_markup(res.get("reply_markup")),
+                    )
+                ]
+            elif "file" in res:
+                inline_result += [
+                    InlineQueryResultDocument(
+                        id=utils.rand(20),
+                        title=res.get("title"),
+                        description=res.get("description"),
+                        caption=res.get("caption"),
+                        parse_mode="HTML",
+                        thumb_url=res.get("thumb", res["file"]),
+                        document_url=res["file"],
+                        mime_type=res["mime_type"],
+                        reply_markup=self.generate_markup(res.get("reply_markup")),
+                    )
+                ]
+
+        return inline_result
+
+    def _get_inline_results(self, key: tuple) -> Optional[list]:
+        if key not in self._inline_results:
+            return None
+
+        expires, results = self._inline_results[key]
+        if expires < time.monotonic():
+            del self._inline_results[key]
+            return None
+
+        self._inline_results.move_to_end(key)
+        return results
+
+    def _cache_inline_results(self, key: tuple, results: list, ttl: int):
+        self._inline_results[key] = (time.monotonic() + ttl, results)
+        self._inline_results.move_to_end(key)
+        while len(self._inline_results) > INLINE_CACHE_SIZE:
+            self._inline_results.popitem(last=False)
+
+    async def _debounce_inline(self, key: tuple, delay: float) -> bool:
+        """
+        Wait for `delay` seconds before processing the query
+        :return: `False`, if user sent a newer query meanwhile, so this one is outdated
+        """
+        if not delay:
+            return True
+
+        token = object()
+        self._inline_debounce[key] = token
+        await asyncio.sleep(delay)
+
+        if self._inline_debounce.get(key) is not token:
+            return False
+
+        del self._inline_debounce[key]
+        return True
+
     async def _callback_query_handler(
         self,
         query: CallbackQuery,
@@ -206,7 +294,11 @@ class Events(InlineUnit):
         for func in self._allmodules.callback_handlers.values():
             if await self.check_inline_security(func=func, user=query.from_user.id):
                 try:
-                    await func(InlineCall(query, self, None))
+                    with self._allmodules.stats.measure(
+                        "callback",
+                        func,
+                    ), rpc.handler_context(func):
+                        await func(InlineCall(query, self, None))
                 except Exception:
                     logger.exception("Error on running callback watcher!")
                     await query.answer(
@@ -215,56 +307,57 @@ class Events(InlineUnit):
                     )
                     continue
 
-        for unit_id, unit in self._units.copy().items():
-            for button in utils.array_sum(unit.get("buttons", [])):
-                if button.get("_callback_data") == query.data:
-                    if (
-                        button.get("disable_security", False)
-                        or unit.get("disable_security", False)
-                        or (
-                            unit.get("force_me", False)
-                            and query.from_user.id == self._me
-                        )
-                        or not unit.get("force_me", False)
-                        and (
-                            await self.check_inline_security(
-                                func=unit.get(
-                                    "perms_map",
-                                    lambda: self._client.dispatcher.security._default,
-                                )(),  # we call it so we can get reloaded rights in runtime
-                                user=query.from_user.id,
-                            )
-                            if "message" in unit
-                            else False
-                        )
-                    ):
-                        pass
-                    elif (
-                        query.from_user.id
-                        not in self._client.dispatcher.security._owner
-                        + unit.get("always_allow", [])
-                        + button.get("always_allow", [])
-                    ):
-                        await query.answer("You are not allowed to press this button!")
-                        return
-
-                    try:
-                        result = await button["callback"](
-                            InlineCall(query, self, unit_id),
-                            *button.get("args", []),
-                            **button.get("kwargs", {}),
-                        )
-                    except Exception:
-                        logger.exception("Error on running callback watcher!")
-                        await query.answer(
-                            "Error occurred while "
-                            "processing request. "
-                            "More info in logs",
-                            show_alert=True,
-                        )
-                        return
-
-                    return result
+        found = self._units.find_button(query.data)
+        if found is not None:
+            unit_id, unit, button = found
+            if (
+                button.get("disable_security", False)
+                or unit.get("disable_security", False)
+                or (unit.get("force_me", False) and query.from_user.id == self._me)
+                or not unit.get("force_me", False)
+                and (
+                    await self.check_inline_security(
+                        func=unit.get(
+                            "perms_map",
+                            lambda: self._client.dispatcher.security._default,
+                        )(),  # we call it so we can get reloaded rights in runtime
+                        user=query.from_user.id,
+                    )
+                    if "message" in unit
+                    else False
+                )
+            ):
+                pass
+            elif (
+                query.from_user.id
+                not in self._client.dispatcher.security._owner
+                + unit.get("always_allow", [])
+                + button.get("always_allow", [])
+            ):
+                await query.answer("You are not allowed to press this button!")
+                return
+
+            try:
+                with self._allmodules.stats.measure(
+                    "callback",
+                    button["callback"],
+                ), rpc.handler_context(button["callback"]):
+                    result = await button["callback"](
+                        InlineCall(query, self, unit_id),
+                        *button.get("args", []),
+                        **button.get("kwargs", {}),
+                    )
+            except Exception:
+                logger.exception("Error on running callback watcher!")
+                await query.answer(
+                    "Error occurred while "
+                    "processing request. "
+                    "More info in logs",
+                    show_alert=True,
+                )
+                return
+
+            return result
 
         if query.data in self._custom_map:
             if (
@@ -295,8 +388,9 @@ class Events(InlineUnit):
                 await query.answer("You are not allowed to press this button!")
                 return
 
+            found = self._units.find_message(query.inline_message_id)
             await self._custom_map[query.data]["handler"](
-                InlineCall(query, self, None),
+                InlineCall(query, self, found[0] if found else None),
                 *self._custom_map[query.data].get("args", []),
                 **self._custom_map[query.data].get("kwargs", {}),
             )
@@ -311,42 +405,32 @@ class Events(InlineUnit):
         if not query:
             return
 
-        for unit_id, unit in self._units.items():
-            if (
-                unit_id == query
-                and "future" in unit
-                and isinstance(unit["future"], Event)
-            ):
-                unit["inline_message_id"] = chosen_inline_query.inline_message_id
-                unit["future"].set()
-                return
+        unit = self._units.get(query)
+        if unit is not None and isinstance(unit.get("future"), Event):
+            self._units.bind_message(query, chosen_inline_query.inline_message_id)
+            unit["future"].set()
+            return
 
-        for unit_id, unit in self._units.copy().items():
-            for button in utils.array_sum(unit.get("buttons", [])):
-                if (
-                    "_switch_query" in button
-                    and "input" in button
-                    and button["_switch_query"] == query.split()[0]
-                    and chosen_inline_query.from_user.id
-                    in [self._me]
-                    + self._client.dispatcher.security._owner
-                    + unit.get("always_allow", [])
-                ):
+        found = self._units.find_input(query.split()[0])
+        if found is not None:
+            unit_id, unit, button = found
+            if chosen_inline_query.from_user.id in (
+                [self._me]
+                + self._client.dispatcher.security._owner
+                + unit.get("always_allow", [])
+            ):
+                query = query.split(maxsplit=1)[1] if len(query.split()) > 1 else ""
 
-                    query = query.split(maxsplit=1)[1] if len(query.split()) > 1 else ""
-
-                    try:
-                        return await button["handler"](
-                            InlineCall(chosen_inline_query, self, unit_id),
-                            query,
-                            *button.get("args", []),
-                            **button.get("kwargs", {}),
-                        )
-                    except Exception:
-                        logger.exception(
-                            "Exception while running chosen query watcher!"
-                        )
-                        return
+                try:
+                    return await button["handler"](
+                        InlineCall(chosen_inline_query, self, unit_id),
+                        query,
+                        *button.get("args", []),
+                        **button.get("kwargs", {}),
+                    )
+                except Exception:
+                    logger.exception("Exception while running chosen query watcher!")
+                    return
 
     async def _query_help(self, inline_query: InlineQuery):
         _help = ""
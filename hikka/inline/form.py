@@ -1,5 +1,6 @@
 import contextlib
 import copy
+import functools
 import logging
 import time
 from asyncio import Event
@@ -10,6 +11,7 @@ import traceback
 
 from aiogram.types import (
     InlineQuery,
+    Message as AiogramMessage,
     InlineQueryResultArticle,
     InlineQueryResultPhoto,
     InputTextMessageContent,
@@ -187,7 +189,12 @@ class Form(InlineUnit):
             logger.error("Invalid type for `ttl`")
             return False
 
-        if isinstance(message, Message) and not silent:
+        if (
+            isinstance(message, Message)
+            and not silent
+            # Unit, sent by bot directly, appears at once
+            and self._direct_chat_id(message) is None
+        ):
             try:
                 status_message = await (
                     message.edit if message.out else message.respond
@@ -231,40 +238,47 @@ class Form(InlineUnit):
             else:
                 await self._client.send_message(message, msg)
 
-        try:
-            q = await self._client.inline_query(self.bot_username, unit_id)
-            m = await q[0].click(
-                utils.get_chat_id(message) if isinstance(message, Message) else message,
-                reply_to=message.reply_to_msg_id
-                if isinstance(message, Message)
-                else None,
-            )
-        except ChatSendInlineForbiddenError:
-            await answer("🚫 <b>You can't send inline units in this chat</b>")
-        except Exception as e:
-            logger.exception("Can't send form")
-
-            if not self._db.get(main.__name__, "inlinelogs", True):
-                msg = f"<b>🚫 Form invoke failed! More info in logs</b>"
-            else:
-                exc = traceback.format_exc()
-                # Remove `Traceback (most recent call last):`
-                exc = "\n".join(exc.splitlines()[1:])
-                msg = (
-                    f"<b>🚫 Form invoke failed!</b>\n\n"
-                    f"<b>🧾 Logs:</b>\n<code>{exc}</code>"
+        if not await self._send_direct(
+            unit_id,
+            message,
+            functools.partial(self._send_form_direct, unit_id),
+        ):
+            try:
+                q = await self._client.inline_query(self.bot_username, unit_id)
+                m = await q[0].click(
+                    utils.get_chat_id(message)
+                    if isinstance(message, Message)
+                    else message,
+                    reply_to=message.reply_to_msg_id
+                    if isinstance(message, Message)
+                    else None,
                 )
+            except ChatSendInlineForbiddenError:
+                await answer("🚫 <b>You can't send inline units in this chat</b>")
+            except Exception as e:
+                logger.exception("Can't send form")
+
+                if not self._db.get(main.__name__, "inlinelogs", True):
+                    msg = f"<b>🚫 Form invoke failed! More info in logs</b>"
+                else:
+                    exc = traceback.format_exc()
+                    # Remove `Traceback (most recent call last):`
+                    exc = "\n".join(exc.splitlines()[1:])
+                    msg = (
+                        f"<b>🚫 Form invoke failed!</b>\n\n"
+                        f"<b>🧾 Logs:</b>\n<code>{exc}</code>"
+                    )
 
-            del self._units[unit_id]
-            await answer(msg)
+                del self._units[unit_id]
+                await answer(msg)
 
-            return False
+                return False
 
-        await self._units[unit_id]["future"].wait()
-        del self._units[unit_id]["future"]
+            await self._units[unit_id]["future"].wait()
+            del self._units[unit_id]["future"]
 
-        self._units[unit_id]["chat"] = utils.get_chat_id(m)
-        self._units[unit_id]["message_id"] = m.id
+            self._units[unit_id]["chat"] = utils.get_chat_id(m)
+            self._units[unit_id]["message_id"] = m.id
 
         if isinstance(message, Message) and message.out:
             await message.delete()
@@ -272,7 +286,14 @@ class Form(InlineUnit):
         if status_message and not message.out:
             await status_message.delete()
 
-        inline_message_id = self._units[unit_id]["inline_message_id"]
+        unit = self._units[unit_id]
+        result = InlineMessage(
+            self,
+            unit_id,
+            unit.get("inline_message_id"),
+            bot_chat_id=unit.get("bot_chat_id"),
+            bot_message_id=unit.get("bot_message_id"),
+        )
 
         if (
             not any(
@@ -287,7 +308,73 @@ class Form(InlineUnit):
                 "doesn't contain any button callbacks"
             )
 
-        return InlineMessage(self, unit_id, inline_message_id)
+        return result
+
+    async def _send_form_direct(
+        self,
+        unit_id: str,
+        chat_id: int,
+        **kwargs,
+    ) -> Optional[AiogramMessage]:
+        """Send form via Bot API. Returns `None`, if form can't be sent this way"""
+        form = self._units[unit_id]
+        markup = self.generate_markup(unit_id)
+
+        if "photo" in form:
+            return await self.bot.send_photo(
+                chat_id,
+                form["photo"],
+                caption=form.get("text"),
+                reply_markup=markup,
+                **kwargs,
+            )
+
+        if "gif" in form:
+            return await self.bot.send_animation(
+                chat_id,
+                form["gif"],
+                caption=form.get("text"),
+                reply_markup=markup,
+                **kwargs,
+            )
+
+        if "video" in form:
+            return await self.bot.send_video(
+                chat_id,
+                form["video"],
+                caption=form.get("text"),
+                reply_markup=markup,
+                **kwargs,
+            )
+
+        if "location" in form:
+            return await self.bot.send_location(
+                chat_id,
+                *form["location"],
+                reply_markup=markup,
+                **kwargs,
+            )
+
+        if "audio" in form:
+            return await self.bot.send_audio(
+                chat_id,
+                form["audio"],
+                caption=form.get("text"),
+                reply_markup=markup,
+                **kwargs,
+            )
+
+        if "file" in form:
+            # Documents are sent with explicit `mime_type` via inline query only
+            return None
+
+        return await self.bot.send_message(
+            chat_id,
+            form["text"],
+            disable_web_page_preview=True,
+            reply_markup=markup,
+            **kwargs,
+        )
 
     async def _form_inline_handler(self, inline_query: InlineQuery):
         try:
@@ -295,45 +382,39 @@ class Form(InlineUnit):
         except IndexError:
             return
 
-        for unit in self._units.copy().values():
-            for button in utils.array_sum(unit.get("buttons", [])):
-                if (
-                    "_switch_query" in button
-                    and "input" in button
-                    and button["_switch_query"] == query
-                    and inline_query.from_user.id
-                    in [self._me]
-                    + self._client.dispatcher.security._owner
-                    + unit.get("always_allow", [])
-                ):
-                    await inline_query.answer(
-                        [
-                            InlineQueryResultArticle(
-                                id=utils.rand(20),
-                                title=button["input"],
-                                description=f"⚠️ Do not remove ID! {random.choice(VERIFICATION_EMOJIES)}",
-                                input_message_content=InputTextMessageContent(
-                                    "🔄 <b>Transferring value to userbot...</b>\n"
-                                    "<i>This message will be deleted automatically</i>"
-                                    if inline_query.from_user.id == self._me
-                                    else "🔄 <b>Transferring value to userbot...</b>",
-                                    "HTML",
-                                    disable_web_page_preview=True,
-                                ),
-                            )
-                        ],
-                        cache_time=60,
-                    )
-                    return
+        found = self._units.find_input(query)
+        if found is not None:
+            _, unit, button = found
+            if inline_query.from_user.id in (
+                [self._me]
+                + self._client.dispatcher.security._owner
+                + unit.get("always_allow", [])
+            ):
+                await inline_query.answer(
+                    [
+                        InlineQueryResultArticle(
+                            id=utils.rand(20),
+                            title=button["input"],
+                            description=f"⚠️ Do not remove ID! {random.choice(VERIFICATION_EMOJIES)}",
+                            input_message_content=InputTextMessageContent(
+                                "🔄 <b>Transferring value to userbot...</b>\n"
+                                "<i>This message will be deleted automatically</i>"
+                                if inline_query.from_user.id == self._me
+                                else "🔄 <b>Transferring value to userbot...</b>",
+                                "HTML",
+                                disable_web_page_preview=True,
+                            ),
+                        )
+                    ],
+                    cache_time=60,
+                )
+                return
 
-        if (
-            inline_query.query not in self._units
-            or self._units[inline_query.query]["type"] != "form"
-        ):
+        # Otherwise, answer it with templated form
+        form = self._units.get_typed(inline_query.query, "form")
+        if form is None:
             return
 
-        # Otherwise, answer it with templated form
-        form = self._units[inline_query.query]
         if "photo" in form:
             await inline_query.answer(
                 [
@@ -15,6 +15,7 @@ from aiogram.types import (
     InlineQueryResultPhoto,
     InputMediaAnimation,
     InputMediaPhoto,
+    Message as AiogramMessage,
 )
 from aiogram.utils.exceptions import BadRequest, InvalidHTTPUrlContent, RetryAfter
 
@@ -29,6 +30,14 @@ from .types import InlineUnit, InlineMessage
 
 logger = logging.getLogger(__name__)
 
+# Maximum amount of simultaneous `next_handler` calls of all galleries
+PREFETCH_CONCURRENCY = 4
+# Amount of `next_handler` calls to get at least one new photo
+PREFETCH_ATTEMPTS = 3
+# Amount of urls, which media kind and Telegram `file_id` are remembered
+MEDIA_CACHE_SIZE = 256
+SLIDESHOW_INTERVAL = 7
+
 
 class ListGalleryHelper:
     def __init__(self, lst: List[str]):
@@ -212,7 +221,12 @@ class Gallery(InlineUnit):
             **({"message": message} if isinstance(message, Message) else {}),
         }
 
-        if isinstance(message, Message) and not silent:
+        if (
+            isinstance(message, Message)
+            and not silent
+            # Unit, sent by bot directly, appears at once
+            and self._direct_chat_id(message) is None
+        ):
             try:
                 status_message = await (
                     message.edit if message.out else message.respond
@@ -229,47 +243,54 @@ class Gallery(InlineUnit):
             else:
                 await self._client.send_message(message, msg)
 
-        try:
-            q = await self._client.inline_query(self.bot_username, unit_id)
-            m = await q[0].click(
-                utils.get_chat_id(message) if isinstance(message, Message) else message,
-                reply_to=message.reply_to_msg_id
-                if isinstance(message, Message)
-                else None,
-            )
-        except ChatSendInlineForbiddenError:
-            await answer("🚫 <b>You can't send inline units in this chat</b>")
-        except Exception as e:
-            logger.exception("Error sending inline gallery")
-
-            del self._units[unit_id]
-
-            if _reattempt:
-                logger.exception("Can't send gallery")
-
-                if not self._db.get(main.__name__, "inlinelogs", True):
-                    msg = f"<b>🚫 Gallery invoke failed! More info in logs</b>"
-                else:
-                    exc = traceback.format_exc()
-                    # Remove `Traceback (most recent call last):`
-                    exc = "\n".join(exc.splitlines()[1:])
-                    msg = (
-                        f"<b>🚫 Gallery invoke failed!</b>\n\n"
-                        f"<b>🧾 Logs:</b>\n<code>{exc}</code>"
-                    )
+        if not await self._send_direct(
+            unit_id,
+            message,
+            functools.partial(self._send_gallery_direct, unit_id),
+        ):
+            try:
+                q = await self._client.inline_query(self.bot_username, unit_id)
+                m = await q[0].click(
+                    utils.get_chat_id(message)
+                    if isinstance(message, Message)
+                    else message,
+                    reply_to=message.reply_to_msg_id
+                    if isinstance(message, Message)
+                    else None,
+                )
+            except ChatSendInlineForbiddenError:
+                await answer("🚫 <b>You can't send inline units in this chat</b>")
+            except Exception as e:
+                logger.exception("Error sending inline gallery")
 
                 del self._units[unit_id]
-                await answer(msg)
 
-                return False
+                if _reattempt:
+                    logger.exception("Can't send gallery")
 
-            return await self.gallery(**utils.get_kwargs())
+                    if not self._db.get(main.__name__, "inlinelogs", True):
+                        msg = f"<b>🚫 Gallery invoke failed! More info in logs</b>"
+                    else:
+                        exc = traceback.format_exc()
+                        # Remove `Traceback (most recent call last):`
+                        exc = "\n".join(exc.splitlines()[1:])
+                        msg = (
+                            f"<b>🚫 Gallery invoke failed!</b>\n\n"
+                            f"<b>🧾 Logs:</b>\n<code>{exc}</code>"
+                        )
+
+                    del self._units[unit_id]
+                    await answer(msg)
+
+                    return False
 
-        await self._units[unit_id]["future"].wait()
-        del self._units[unit_id]["future"]
+                return await self.gallery(**utils.get_kwargs())
 
-        self._units[unit_id]["chat"] = utils.get_chat_id(m)
-        self._units[unit_id]["message_id"] = m.id
+            await self._units[unit_id]["future"].wait()
+            del self._units[unit_id]["future"]
+
+            self._units[unit_id]["chat"] = utils.get_chat_id(m)
+            self._units[unit_id]["message_id"] = m.id
 
         if isinstance(message, Message) and message.out:
             await message.delete()
@@ -280,7 +301,14 @@ class Gallery(InlineUnit):
         if not isinstance(next_handler, ListGalleryHelper):
             asyncio.ensure_future(self._load_gallery_photos(unit_id))
 
-        return InlineMessage(self, unit_id, self._units[unit_id]["inline_message_id"])
+        unit = self._units[unit_id]
+        return InlineMessage(
+            self,
+            unit_id,
+            unit.get("inline_message_id"),
+            bot_chat_id=unit.get("bot_chat_id"),
+            bot_message_id=unit.get("bot_message_id"),
+        )
 
     async def _call_photo(self, callback: callable) -> Union[str, bool]:
         """Parses photo url from `callback`. Returns url on success, otherwise `False`"""
@@ -303,50 +331,97 @@ class Gallery(InlineUnit):
         return photo_url
 
     async def _load_gallery_photos(self, unit_id: str):
-        """Preloads photo. Should be called via ensure_future"""
-        unit = self._units[unit_id]
+        """Preloads photos. Should be called via ensure_future"""
+        unit = self._units.get(unit_id)
+        if unit is None:
+            return
 
-        photo_url = await self._call_photo(unit["next_handler"])
+        if unit.get("loading") is None or unit["loading"].done():
+            unit["loading"] = asyncio.ensure_future(self._fetch_gallery_photos(unit_id))
 
-        self._units[unit_id]["photos"] += (
-            [photo_url] if isinstance(photo_url, str) else photo_url
-        )
+        # Concurrent calls wait for the same load instead of starting another one
+        await asyncio.shield(unit["loading"])
 
+    async def _fetch_gallery_photos(self, unit_id: str):
         unit = self._units[unit_id]
+        seen = unit.setdefault("seen", set(unit["photos"]))
 
-        # If only one preload was insufficient to load needed amount of photos
-        if unit.get("preload", False) and len(unit["photos"]) - unit[
-            "current_index"
-        ] < unit.get("preload", False):
-            # Start load again
-            asyncio.ensure_future(self._load_gallery_photos(unit_id))
-
-    async def _gallery_slideshow_loop(
-        self,
-        call: CallbackQuery,
-        unit_id: str = None,
-    ):
-        while True:
-            await asyncio.sleep(7)
-
-            unit = self._units[unit_id]
+        for _ in range(PREFETCH_ATTEMPTS):
+            try:
+                async with self._gallery_semaphore:
+                    photo_url = await self._call_photo(unit["next_handler"])
+            except Exception:
+                logger.exception(f"Can't load next photo of gallery {unit_id}")
+                return
 
-            if unit_id not in self._units or not unit.get("slideshow", False):
+            if unit_id not in self._units or not photo_url:
                 return
 
-            if unit["current_index"] + 1 >= len(unit["photos"]) and isinstance(
-                unit["next_handler"],
-                ListGalleryHelper,
+            new = [
+                url
+                for url in ([photo_url] if isinstance(photo_url, str) else photo_url)
+                if url not in seen
+            ]
+            seen.update(new)
+            unit["photos"] += new
+
+            # Load again, if we got only duplicates or
+            # one load was insufficient to preload needed amount of photos
+            if new and (
+                not unit.get("preload", False)
+                or len(unit["photos"]) - unit["current_index"] >= unit["preload"]
             ):
-                del self._units[unit_id]["slideshow"]
-                self._units[unit_id]["current_index"] -= 1
+                return
 
-            await self._gallery_page(
-                call,
-                self._units[unit_id]["current_index"] + 1,
-                unit_id=unit_id,
+    def _start_slideshow(self, call: CallbackQuery, unit_id: str):
+        self._slideshows[unit_id] = (call, time.monotonic() + SLIDESHOW_INTERVAL)
+        if self._slideshow_task is None or self._slideshow_task.done():
+            self._slideshow_task = asyncio.ensure_future(self._slideshow_ticker())
+
+    async def _slideshow_ticker(self):
+        """Switch photos of all active slideshows from the single task"""
+        while self._slideshows:
+            # Interval is the same for all slideshows, so new
+            # ones are never due earlier than the current ones
+            await asyncio.sleep(
+                max(
+                    min(due for _, due in self._slideshows.values())
+                    - time.monotonic(),
+                    0,
+                )
             )
 
+            now = time.monotonic()
+            steps = []
+            for unit_id, (call, due) in list(self._slideshows.items()):
+                if unit_id not in self._units or not self._units[unit_id].get(
+                    "slideshow", False
+                ):
+                    del self._slideshows[unit_id]
+                    continue
+
+                if due <= now:
+                    self._slideshows[unit_id] = (call, now + SLIDESHOW_INTERVAL)
+                    steps += [self._slideshow_step(call, unit_id)]
+
+            await asyncio.gather(*steps, return_exceptions=True)
+
+    async def _slideshow_step(self, call: CallbackQuery, unit_id: str):
+        unit = self._units[unit_id]
+
+        if unit["current_index"] + 1 >= len(unit["photos"]) and isinstance(
+            unit["next_handler"],
+            ListGalleryHelper,
+        ):
+            del self._units[unit_id]["slideshow"]
+            self._units[unit_id]["current_index"] -= 1
+
+        await self._gallery_page(
+            call,
+            self._units[unit_id]["current_index"] + 1,
+            unit_id=unit_id,
+        )
+
     async def _gallery_slideshow(
         self,
         call: CallbackQuery,
@@ -355,25 +430,20 @@ class Gallery(InlineUnit):
         if not self._units[unit_id].get("slideshow", False):
             self._units[unit_id]["slideshow"] = True
             await self.bot.edit_message_reply_markup(
-                inline_message_id=call.inline_message_id,
+                **self._edit_target(self._units[unit_id], call),
                 reply_markup=self._gallery_markup(unit_id),
             )
             await call.answer("✅ Slideshow on")
         else:
             del self._units[unit_id]["slideshow"]
             await self.bot.edit_message_reply_markup(
-                inline_message_id=call.inline_message_id,
+                **self._edit_target(self._units[unit_id], call),
                 reply_markup=self._gallery_markup(unit_id),
             )
             await call.answer("🚫 Slideshow off")
             return
 
-        asyncio.ensure_future(
-            self._gallery_slideshow_loop(
-                call,
-                unit_id,
-            )
-        )
+        self._start_slideshow(call, unit_id)
 
     async def _gallery_back(
         self,
@@ -394,10 +464,13 @@ class Gallery(InlineUnit):
             return
 
         try:
-            await self.bot.edit_message_media(
-                inline_message_id=call.inline_message_id,
-                media=self._get_current_media(unit_id),
-                reply_markup=self._gallery_markup(unit_id),
+            self._remember_media(
+                self._get_next_photo(unit_id),
+                await self.bot.edit_message_media(
+                    **self._edit_target(self._units[unit_id], call),
+                    media=self._get_current_media(unit_id),
+                    reply_markup=self._gallery_markup(unit_id),
+                ),
             )
         except RetryAfter as e:
             await call.answer(
@@ -409,19 +482,52 @@ class Gallery(InlineUnit):
             await call.answer("Error occurred", show_alert=True)
             return
 
+    def _resolve_media(self, url: str) -> dict:
+        """
+        Get cached info about media: whether it's animation by its extension
+        and its `file_id`, if Telegram already has it
+        """
+        if url in self._gallery_media:
+            self._gallery_media.move_to_end(url)
+            return self._gallery_media[url]
+
+        try:
+            path = urlparse(url).path
+            ext = os.path.splitext(path)[1]
+        except Exception:
+            ext = None
+
+        self._gallery_media[url] = {"gif": ext in {".gif", ".mp4"}, "file_id": None}
+        while len(self._gallery_media) > MEDIA_CACHE_SIZE:
+            self._gallery_media.popitem(last=False)
+
+        return self._gallery_media[url]
+
+    def _remember_media(self, url: str, message: Union[AiogramMessage, bool]):
+        """Save `file_id` of media, so Telegram doesn't download it again"""
+        if not isinstance(message, AiogramMessage):
+            # Inline messages are edited without returning the result
+            return
+
+        if message.animation:
+            file_id = message.animation.file_id
+        elif message.photo:
+            file_id = message.photo[-1].file_id
+        else:
+            return
+
+        self._resolve_media(url)["file_id"] = file_id
+
     def _get_current_media(
         self,
         unit_id: str,
     ) -> Union[InputMediaPhoto, InputMediaAnimation]:
         """Return current media, which should be updated in gallery"""
-        media = self._get_next_photo(unit_id)
-        try:
-            path = urlparse(media).path
-            ext = os.path.splitext(path)[1]
-        except Exception:
-            ext = None
+        url = self._get_next_photo(unit_id)
+        info = self._resolve_media(url)
+        media = info["file_id"] or url
 
-        if self._units[unit_id].get("gif", False) or ext in {".gif", ".mp4"}:
+        if self._units[unit_id].get("gif", False) or info["gif"]:
             return InputMediaAnimation(
                 media=media,
                 caption=self._get_caption(
@@ -487,14 +593,20 @@ class Gallery(InlineUnit):
                 logger.debug(f"Started preload for gallery {unit_id}")
                 asyncio.ensure_future(self._load_gallery_photos(unit_id))
 
+        url = self._get_next_photo(unit_id)
+
         try:
-            await self.bot.edit_message_media(
-                inline_message_id=call.inline_message_id,
-                media=self._get_current_media(unit_id),
-                reply_markup=self._gallery_markup(unit_id),
+            self._remember_media(
+                url,
+                await self.bot.edit_message_media(
+                    **self._edit_target(self._units[unit_id], call),
+                    media=self._get_current_media(unit_id),
+                    reply_markup=self._gallery_markup(unit_id),
+                ),
             )
         except (InvalidHTTPUrlContent, BadRequest):
             logger.debug("Error fetching photo content, attempting load next one")
+            self._gallery_media.pop(url, None)
             del self._units[unit_id]["photos"][self._units[unit_id]["current_index"]]
             self._units[unit_id]["current_index"] -= 1
             return await self._gallery_page(call, page, unit_id)
@@ -590,35 +702,57 @@ class Gallery(InlineUnit):
             + [[{"text": "🔻 Close", "callback": callback, "args": ("close",)}]],
         )
 
+    async def _send_gallery_direct(
+        self,
+        unit_id: str,
+        chat_id: int,
+        **kwargs,
+    ) -> AiogramMessage:
+        """Send gallery via Bot API"""
+        unit = self._units[unit_id]
+        info = self._resolve_media(unit["photo_url"])
+
+        message = await (
+            self.bot.send_animation
+            if unit.get("gif", False) or info["gif"]
+            else self.bot.send_photo
+        )(
+            chat_id,
+            info["file_id"] or unit["photo_url"],
+            caption=self._get_caption(unit_id, index=0),
+            reply_markup=self._gallery_markup(unit_id),
+            **kwargs,
+        )
+        self._remember_media(unit["photo_url"], message)
+        return message
+
     async def _gallery_inline_handler(self, inline_query: InlineQuery):
-        for unit in self._units.copy().values():
-            if (
-                inline_query.from_user.id == self._me
-                and inline_query.query == unit["uid"]
-                and unit["type"] == "gallery"
-            ):
-                try:
-                    path = urlparse(unit["photo_url"]).path
-                    ext = os.path.splitext(path)[1]
-                except Exception:
-                    ext = None
-
-                args = {
-                    "thumb_url": "https://img.icons8.com/fluency/344/loading.png",
-                    "caption": self._get_caption(unit["uid"], index=0),
-                    "parse_mode": "HTML",
-                    "reply_markup": self._gallery_markup(unit["uid"]),
-                    "id": utils.rand(20),
-                    "title": "Processing inline gallery",
-                }
-
-                if unit.get("gif", False) or ext in {".gif", ".mp4"}:
-                    await inline_query.answer(
-                        [InlineQueryResultGif(gif_url=unit["photo_url"], **args)]
-                    )
-                    return
-
-                await inline_query.answer(
-                    [InlineQueryResultPhoto(photo_url=unit["photo_url"], **args)],
-                    cache_time=0,
-                )
+        unit = self._units.get_typed(inline_query.query, "gallery")
+        if unit is None or inline_query.from_user.id != self._me:
+            return
+
+        try:
+            path = urlparse(unit["photo_url"]).path
+            ext = os.path.splitext(path)[1]
+        except Exception:
+            ext = None
+
+        args = {
+            "thumb_url": "https://img.icons8.com/fluency/344/loading.png",
+            "caption": self._get_caption(unit["uid"], index=0),
+            "parse_mode": "HTML",
+            "reply_markup": self._gallery_markup(unit["uid"]),
+            "id": utils.rand(20),
+            "title": "Processing inline gallery",
+        }
+
+        if unit.get("gif", False) or ext in {".gif", ".mp4"}:
+            await inline_query.answer(
+                [InlineQueryResultGif(gif_url=unit["photo_url"], **args)]
+            )
+            return
+
+        await inline_query.answer(
+            [InlineQueryResultPhoto(photo_url=unit["photo_url"], **args)],
+            cache_time=0,
+        )
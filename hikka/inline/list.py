@@ -15,6 +15,7 @@ from aiogram.types import (
     InlineQuery,
     InlineQueryResultArticle,
     InputTextMessageContent,
+    Message as AiogramMessage,
 )
 from aiogram.utils.exceptions import RetryAfter
 
@@ -148,7 +149,12 @@ class List(InlineUnit):
             **({"message": message} if isinstance(message, Message) else {}),
         }
 
-        if isinstance(message, Message) and not silent:
+        if (
+            isinstance(message, Message)
+            and not silent
+            # Unit, sent by bot directly, appears at once
+            and self._direct_chat_id(message) is None
+        ):
             try:
                 status_message = await (
                     message.edit if message.out else message.respond
@@ -165,40 +171,47 @@ class List(InlineUnit):
             else:
                 await self._client.send_message(message, msg)
 
-        try:
-            q = await self._client.inline_query(self.bot_username, unit_id)
-            m = await q[0].click(
-                utils.get_chat_id(message) if isinstance(message, Message) else message,
-                reply_to=message.reply_to_msg_id
-                if isinstance(message, Message)
-                else None,
-            )
-        except ChatSendInlineForbiddenError:
-            await answer("🚫 <b>You can't send inline units in this chat</b>")
-        except Exception:
-            logger.exception("Can't send list")
-
-            if not self._db.get(main.__name__, "inlinelogs", True):
-                msg = f"<b>🚫 List invoke failed! More info in logs</b>"
-            else:
-                exc = traceback.format_exc()
-                # Remove `Traceback (most recent call last):`
-                exc = "\n".join(exc.splitlines()[1:])
-                msg = (
-                    f"<b>🚫 List invoke failed!</b>\n\n"
-                    f"<b>🧾 Logs:</b>\n<code>{exc}</code>"
+        if not await self._send_direct(
+            unit_id,
+            message,
+            functools.partial(self._send_list_direct, unit_id),
+        ):
+            try:
+                q = await self._client.inline_query(self.bot_username, unit_id)
+                m = await q[0].click(
+                    utils.get_chat_id(message)
+                    if isinstance(message, Message)
+                    else message,
+                    reply_to=message.reply_to_msg_id
+                    if isinstance(message, Message)
+                    else None,
                 )
+            except ChatSendInlineForbiddenError:
+                await answer("🚫 <b>You can't send inline units in this chat</b>")
+            except Exception:
+                logger.exception("Can't send list")
 
-            del self._units[unit_id]
-            await answer(msg)
+                if not self._db.get(main.__name__, "inlinelogs", True):
+                    msg = f"<b>🚫 List invoke failed! More info in logs</b>"
+                else:
+                    exc = traceback.format_exc()
+                    # Remove `Traceback (most recent call last):`
+                    exc = "\n".join(exc.splitlines()[1:])
+                    msg = (
+                        f"<b>🚫 List invoke failed!</b>\n\n"
+                        f"<b>🧾 Logs:</b>\n<code>{exc}</code>"
+                    )
 
-            return False
+                del self._units[unit_id]
+                await answer(msg)
+
+                return False
 
-        await self._units[unit_id]["future"].wait()
-        del self._units[unit_id]["future"]
+            await self._units[unit_id]["future"].wait()
+            del self._units[unit_id]["future"]
 
-        self._units[unit_id]["chat"] = utils.get_chat_id(m)
-        self._units[unit_id]["message_id"] = m.id
+            self._units[unit_id]["chat"] = utils.get_chat_id(m)
+            self._units[unit_id]["message_id"] = m.id
 
         if isinstance(message, Message) and message.out:
             await message.delete()
@@ -206,7 +219,14 @@ class List(InlineUnit):
         if status_message and not message.out:
             await status_message.delete()
 
-        return InlineMessage(self, unit_id, self._units[unit_id]["inline_message_id"])
+        unit = self._units[unit_id]
+        return InlineMessage(
+            self,
+            unit_id,
+            unit.get("inline_message_id"),
+            bot_chat_id=unit.get("bot_chat_id"),
+            bot_message_id=unit.get("bot_message_id"),
+        )
 
     async def _list_page(
         self,
@@ -228,7 +248,7 @@ class List(InlineUnit):
 
         try:
             await self.bot.edit_message_text(
-                inline_message_id=call.inline_message_id,
+                **self._edit_target(self._units[unit_id], call),
                 text=self._units[unit_id]["strings"][
                     self._units[unit_id]["current_index"]
                 ],
@@ -245,6 +265,21 @@ class List(InlineUnit):
             await call.answer("Error occurred", show_alert=True)
             return
 
+    async def _send_list_direct(
+        self,
+        unit_id: str,
+        chat_id: int,
+        **kwargs,
+    ) -> AiogramMessage:
+        """Send list via Bot API"""
+        return await self.bot.send_message(
+            chat_id,
+            self._units[unit_id]["strings"][0],
+            disable_web_page_preview=True,
+            reply_markup=self._list_markup(unit_id),
+            **kwargs,
+        )
+
     def _list_markup(self, unit_id: str) -> InlineKeyboardMarkup:
         """Generates aiogram markup for `list`"""
         callback = functools.partial(self._list_page, unit_id=unit_id)
@@ -259,24 +294,22 @@ class List(InlineUnit):
         )
 
     async def _list_inline_handler(self, inline_query: InlineQuery):
-        for unit in self._units.copy().values():
-            if (
-                inline_query.from_user.id == self._me
-                and inline_query.query == unit["uid"]
-                and unit["type"] == "list"
-            ):
-                await inline_query.answer(
-                    [
-                        InlineQueryResultArticle(
-                            id=utils.rand(20),
-                            title="Hikka",
-                            input_message_content=InputTextMessageContent(
-                                unit["strings"][0],
-                                "HTML",
-                                disable_web_page_preview=True,
-                            ),
-                            reply_markup=self._list_markup(inline_query.query),
-                        )
-                    ],
-                    cache_time=60,
+        unit = self._units.get_typed(inline_query.query, "list")
+        if unit is None or inline_query.from_user.id != self._me:
+            return
+
+        await inline_query.answer(
+            [
+                InlineQueryResultArticle(
+                    id=utils.rand(20),
+                    title="Hikka",
+                    input_message_content=InputTextMessageContent(
+                        unit["strings"][0],
+                        "HTML",
+                        disable_web_page_preview=True,
+                    ),
+                    reply_markup=self._list_markup(inline_query.query),
                 )
+            ],
+            cache_time=60,
+        )
@@ -0,0 +1,139 @@
+from typing import Optional, Tuple
+
+from .. import utils
+
+
+class UnitStore(dict):
+    """
+    Storage of inline units (`unit_id: unit`), which keeps indexes
+    for lookups, performed on each inline query and button press.
+    Units are kept as plain `dict`s, because modules access them directly.
+    `inline_message_id` of unit must be set via `bind_message`
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._by_type = {}
+        self._buttons = {}
+        self._inputs = {}
+        self._messages = {}
+        self._stale = True
+
+        for unit_id, unit in self.items():
+            self._remember(unit_id, unit)
+
+    def __setitem__(self, unit_id: str, unit: dict):
+        if unit_id in self:
+            self._forget(unit_id)
+
+        super().__setitem__(unit_id, unit)
+        self._remember(unit_id, unit)
+        self._stale = True
+
+    def __delitem__(self, unit_id: str):
+        self._forget(unit_id)
+        super().__delitem__(unit_id)
+        self._stale = True
+
+    def pop(self, unit_id: str, *args):
+        if unit_id in self:
+            self._forget(unit_id)
+            self._stale = True
+
+        return super().pop(unit_id, *args)
+
+    def clear(self):
+        super().clear()
+        self._by_type = {}
+        self._messages = {}
+        self._stale = True
+
+    def _remember(self, unit_id: str, unit: dict):
+        self._by_type.setdefault(unit.get("type"), {})[unit_id] = unit
+        if unit.get("inline_message_id"):
+            self._messages[unit["inline_message_id"]] = unit_id
+
+    def _forget(self, unit_id: str):
+        unit = super().__getitem__(unit_id)
+        self._by_type.get(unit.get("type"), {}).pop(unit_id, None)
+        if self._messages.get(unit.get("inline_message_id")) == unit_id:
+            del self._messages[unit["inline_message_id"]]
+
+    def bind_message(self, unit_id: str, inline_message_id: str):
+        """Set inline message of unit, so unit can be found by it"""
+        unit = super().__getitem__(unit_id)
+        if self._messages.get(unit.get("inline_message_id")) == unit_id:
+            del self._messages[unit["inline_message_id"]]
+
+        unit["inline_message_id"] = inline_message_id
+        self._messages[inline_message_id] = unit_id
+
+    def find_message(self, inline_message_id: str) -> Optional[Tuple[str, dict]]:
+        """
+        Find unit by its inline message
+        :return: Tuple of unit id and unit or `None`
+        """
+        unit_id = self._messages.get(inline_message_id)
+        if unit_id is None or unit_id not in self:
+            return None
+
+        return unit_id, super().__getitem__(unit_id)
+
+    def invalidate(self):
+        """
+        Mark button indexes as outdated. Must be called, when buttons of unit
+        are replaced or get their callback data / switch queries
+        """
+        self._stale = True
+
+    def _reindex(self):
+        self._buttons = {}
+        self._inputs = {}
+        for unit_id, unit in self.items():
+            for button in utils.array_sum(unit.get("buttons", [])):
+                if not isinstance(button, dict):
+                    continue
+
+                if "_callback_data" in button:
+                    self._buttons[button["_callback_data"]] = (unit_id, button)
+
+                if "_switch_query" in button and "input" in button:
+                    self._inputs[button["_switch_query"]] = (unit_id, button)
+
+        self._stale = False
+
+    def of_type(self, type_: str) -> dict:
+        """Get units of certain type (`form`, `list`, `gallery`)"""
+        return self._by_type.get(type_, {})
+
+    def get_typed(self, unit_id: str, type_: str) -> Optional[dict]:
+        """Get unit by its id, if it has the specified type"""
+        return self.of_type(type_).get(unit_id)
+
+    def _lookup(self, index: str, key: str) -> Optional[Tuple[str, dict, dict]]:
+        if self._stale:
+            self._reindex()
+
+        found = getattr(self, index).get(key)
+        if found is None:
+            return None
+
+        unit_id, button = found
+        if unit_id not in self:
+            return None
+
+        return unit_id, super().__getitem__(unit_id), button
+
+    def find_button(self, callback_data: str) -> Optional[Tuple[str, dict, dict]]:
+        """
+        Find button with callback by its callback data
+        :return: Tuple of unit id, unit and button or `None`
+        """
+        return self._lookup("_buttons", callback_data)
+
+    def find_input(self, switch_query: str) -> Optional[Tuple[str, dict, dict]]:
+        """
+        Find input button by its switch query
+        :return: Tuple of unit id, unit and button or `None`
+        """
+        return self._lookup("_inputs", switch_query)
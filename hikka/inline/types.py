@@ -19,9 +19,15 @@ class InlineMessage:
         inline_manager: "InlineManager",  # type: ignore
         unit_id: str,
         inline_message_id: str,
+        bot_chat_id: Optional[int] = None,
+        bot_message_id: Optional[int] = None,
     ):
         self.inline_message_id = inline_message_id
         self.unit_id = unit_id
+        # Message of unit, sent by bot directly. It's kept here, so
+        # the message can be edited or deleted even after unit is unloaded
+        self.bot_chat_id = bot_chat_id
+        self.bot_message_id = bot_message_id
         self.inline_manager = inline_manager
         self._units = inline_manager._units
         self.form = (
@@ -35,10 +41,15 @@ class InlineMessage:
         if "inline_message_id" in kwargs:
             kwargs.pop("inline_message_id")
 
+        kwargs.pop("bot_chat_id", None)
+        kwargs.pop("bot_message_id", None)
+
         return await self.inline_manager._edit_unit(
             *args,
             unit_id=self.unit_id,
             inline_message_id=self.inline_message_id,
+            bot_chat_id=self.bot_chat_id,
+            bot_message_id=self.bot_message_id,
             **kwargs,
         )
 
@@ -1,5 +1,4 @@
 import asyncio
-import inspect
 import logging
 import contextlib
 import io
@@ -21,13 +20,18 @@ from aiogram.types import (
 )
 
 from aiogram.utils.exceptions import (
+    ChatAdminRequired,
+    ChatNotFound,
     InvalidQueryID,
     MessageIdInvalid,
     MessageNotModified,
+    NeedAdministratorRightsInTheChannel,
     RetryAfter,
+    Unauthorized,
 )
+from telethon.tl.types import Message
 
-from .. import utils
+from .. import main, rpc, utils
 from .._types import Module
 from .types import InlineUnit, InlineCall
 
@@ -54,6 +58,7 @@ class Utils(InlineUnit):
         map_ = self._normalize_markup(map_)
 
         setup_callbacks = False
+        setup_inputs = False
 
         for row in map_:
             for button in row:
@@ -89,6 +94,11 @@ class Utils(InlineUnit):
 
                 if "input" in button and "_switch_query" not in button:
                     button["_switch_query"] = utils.rand(10)
+                    setup_inputs = True
+
+        if setup_callbacks or setup_inputs:
+            # Buttons of units are indexed by these values
+            self._units.invalidate()
 
         for row in map_:
             line = []
@@ -220,27 +230,22 @@ class Utils(InlineUnit):
         )
 
     def _find_caller_sec_map(self) -> Union[callable, None]:
-        try:
-            for stack_entry in inspect.stack():
-                if hasattr(stack_entry, "function") and (
-                    stack_entry.function.endswith("cmd")
-                    or stack_entry.function.endswith("_inline_handler")
-                ):
-                    logger.debug(f"Found caller: {stack_entry.function}")
-                    return next(
-                        lambda: self._client.dispatcher.security.get_flags(
-                            getattr(
-                                cls_,
-                                stack_entry.function,
-                            ),
-                        )
-                        for name, cls_ in stack_entry.frame.f_globals.items()
-                        if name.endswith("Mod") and issubclass(cls_, Module)
-                    )
-        except Exception:
-            logger.debug("Can't parse security mask in form", exc_info=True)
+        """
+        Get security mask getter of command or inline handler, which
+        creates the unit. Handler is set by dispatcher and inline manager
+        """
+        handler = rpc.current_handler.get()
+        while isinstance(handler, functools.partial):
+            handler = handler.func
+
+        name = getattr(handler, "__name__", "")
+        if not isinstance(getattr(handler, "__self__", None), Module) or not (
+            name.endswith("cmd") or name.endswith("_inline_handler")
+        ):
+            return None
 
-        return None
+        logger.debug(f"Found caller: {name}")
+        return functools.partial(self._client.dispatcher.security.get_flags, handler)
 
     def _normalize_markup(self, reply_markup: Union[dict, list]) -> list:
         if isinstance(reply_markup, dict):
@@ -253,6 +258,119 @@ class Utils(InlineUnit):
 
         return reply_markup
 
+    def _direct_chat_id(self, message: Union[Message, int]) -> Optional[int]:
+        """
+        Get Bot API id of chat, where unit can be sent by bot directly
+        :return: Chat id or `None`, if unit must be sent via inline query
+        """
+        if not self._db.get(main.__name__, "direct_inline", True):
+            return None
+
+        chat_id = message.chat_id if isinstance(message, Message) else message
+        if not isinstance(chat_id, int):
+            return None
+
+        if chat_id == self.bot_id:
+            # Unit is requested in PM with bot, so it's sent to owner
+            chat_id = self._me
+        elif chat_id > 0:
+            # Bot can't write to arbitrary users and unmarked ids are ambiguous
+            return None
+
+        return None if chat_id in self._direct_forbidden else chat_id
+
+    async def _send_direct(
+        self,
+        unit_id: str,
+        message: Union[Message, int],
+        send: callable,
+    ) -> bool:
+        """
+        Send unit by bot itself, skipping inline query round trips
+        :param unit_id: Id of unit, which is already stored in `_units`
+        :param message: Message or chat id, where unit is requested
+        :param send: Coroutine function, which accepts Bot API chat id and
+            extra arguments of `send_*` method, and sends the unit
+        :return: `True`, if unit is sent, otherwise it must be sent via inline query
+        """
+        chat_id = self._direct_chat_id(message)
+        if chat_id is None:
+            return False
+
+        kwargs = {}
+        if (
+            isinstance(message, Message)
+            and message.reply_to_msg_id
+            and str(chat_id).startswith("-100")
+        ):
+            # Message ids are shared by all members of supergroups and channels only
+            kwargs = {
+                "reply_to_message_id": message.reply_to_msg_id,
+                "allow_sending_without_reply": True,
+            }
+
+        try:
+            m = await send(chat_id, **kwargs)
+        except (
+            ChatNotFound,
+            ChatAdminRequired,
+            NeedAdministratorRightsInTheChannel,
+            Unauthorized,
+        ):
+            # Bot is not a member of chat or can't post there, so
+            # there is no point in trying again
+            logger.debug(f"Can't send unit to {chat_id} directly", exc_info=True)
+            self._direct_forbidden.add(chat_id)
+            return False
+        except Exception:
+            logger.debug(f"Can't send unit to {chat_id} directly", exc_info=True)
+            return False
+
+        if m is None:
+            return False
+
+        unit = self._units[unit_id]
+        unit.pop("future", None)
+        unit["bot_chat_id"] = chat_id
+        unit["bot_message_id"] = m.message_id
+        unit["chat"] = (
+            utils.get_chat_id(message) if isinstance(message, Message) else message
+        )
+        unit["message_id"] = (
+            m.message_id if str(chat_id).startswith("-100") else None
+        )
+        return True
+
+    def _edit_target(
+        self,
+        unit: dict,
+        query: Optional[CallbackQuery] = None,
+        inline_message_id: Optional[str] = None,
+    ) -> dict:
+        """Get arguments of Bot API edit methods, which point to the message of unit"""
+        inline_message_id = (
+            inline_message_id
+            or unit.get("inline_message_id")
+            or getattr(query, "inline_message_id", None)
+        )
+
+        if inline_message_id:
+            return {"inline_message_id": inline_message_id}
+
+        if unit.get("bot_message_id"):
+            return {
+                "chat_id": unit["bot_chat_id"],
+                "message_id": unit["bot_message_id"],
+            }
+
+        if getattr(query, "message", None) is not None:
+            return {
+                "chat_id": query.message.chat.id,
+                "message_id": query.message.message_id,
+            }
+
+        return {}
+
     async def _edit_unit(
         self,
         text: str,
@@ -271,6 +389,8 @@ class Utils(InlineUnit):
         query: CallbackQuery = None,
         unit_id: str = None,
         inline_message_id: Union[str, None] = None,
+        bot_chat_id: Optional[int] = None,
+        bot_message_id: Optional[int] = None,
     ):
         """Do not edit or pass `self`, `query`, `unit_id` params, they are for internal use only"""
         if isinstance(reply_markup, (list, dict)):
@@ -324,10 +444,19 @@ class Utils(InlineUnit):
             logger.error("You passed two or more exclusive parameters simultaneously")
             return False
 
+        if unit_id not in self._units and inline_message_id:
+            # Message is edited without unit id, e.g. by custom callback
+            found = self._units.find_message(inline_message_id)
+            if found is not None:
+                unit_id = found[0]
+
         if unit_id is not None and unit_id in self._units:
             unit = self._units[unit_id]
+            if inline_message_id and not unit.get("inline_message_id"):
+                self._units.bind_message(unit_id, inline_message_id)
 
             unit["buttons"] = reply_markup
+            self._units.invalidate()
 
             if isinstance(force_me, bool):
                 unit["force_me"] = force_me
@@ -337,16 +466,15 @@ class Utils(InlineUnit):
 
             if isinstance(always_allow, list):
                 unit["always_allow"] = always_allow
+        elif bot_message_id:
+            # Unit is unloaded, but its message was sent by bot directly
+            unit = {"bot_chat_id": bot_chat_id, "bot_message_id": bot_message_id}
         else:
             unit = {}
 
-        inline_message_id = (
-            inline_message_id
-            or unit.get("inline_message_id", False)
-            or query.inline_message_id
-        )
+        target = self._edit_target(unit, query, inline_message_id)
 
-        if not inline_message_id:
+        if not target:
             logger.warning(
                 "Attempted to edit message with no `inline_message_id`. "
                 "Possible reasons:\n"
@@ -360,7 +488,7 @@ class Utils(InlineUnit):
             try:
                 await self.bot.edit_message_text(
                     text,
-                    inline_message_id=inline_message_id,
+                    **target,
                     disable_web_page_preview=disable_web_page_preview,
                     reply_markup=self.generate_markup(
                         reply_markup
@@ -412,7 +540,7 @@ class Utils(InlineUnit):
 
         try:
             await self.bot.edit_message_media(
-                inline_message_id=inline_message_id,
+                **target,
                 media=media,
                 reply_markup=self.generate_markup(
                     reply_markup
@@ -440,10 +568,20 @@ class Utils(InlineUnit):
             unit_id = call.unit_id
 
         try:
-            await self._client.delete_messages(
-                self._units[unit_id]["chat"],
-                [self._units[unit_id]["message_id"]],
-            )
+            unit = self._units.get(unit_id) or {
+                "bot_chat_id": getattr(call, "bot_chat_id", None),
+                "bot_message_id": getattr(call, "bot_message_id", None),
+            }
+            if unit.get("bot_message_id"):
+                await self.bot.delete_message(
+                    unit["bot_chat_id"],
+                    unit["bot_message_id"],
+                )
+            else:
+                await self._client.delete_messages(
+                    unit["chat"],
+                    [unit["message_id"]],
+                )
 
             await self._unload_unit(None, unit_id)
         except Exception:
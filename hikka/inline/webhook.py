@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Optional
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.utils.exceptions import (
+    RetryAfter,
+    TerminatedByOtherGetUpdates,
+    Unauthorized,
+)
+
+from .types import InlineUnit
+
+logger = logging.getLogger(__name__)
+
+# `off` - long polling, `on` - Telegram posts updates to public url,
+# `local` - updates are fetched by polling and posted to local webhook,
+# which is useful to test webhook mode without public url
+WEBHOOK_MODES = ("off", "on", "local")
+
+# Time in seconds to wait for web server to start
+WEB_START_TIMEOUT = 30
+# Maximum delay in seconds between retries of failed `getUpdates` in `local` mode
+RELAY_MAX_BACKOFF = 60
+
+
+class Webhook(InlineUnit):
+    # Way, the bot receives updates: `polling`, `webhook` or `local`
+    update_transport = None
+
+    @property
+    def _webhook_secret(self) -> str:
+        """Path of webhook, which is known only by Telegram and us"""
+        return hashlib.sha256(self._token.encode("utf-8")).hexdigest()
+
+    def _get_webhook_base(self) -> Optional[str]:
+        """Public url of web server, which Telegram can post updates to"""
+        url = os.environ.get("WEBHOOK_URL") or self._db.get(
+            "hikka.inline",
+            "webhook_url",
+            None,
+        )
+        return url.rstrip("/") if url else None
+
+    async def _get_web(self) -> Optional["Web"]:  # type: ignore
+        web = getattr(self._client, "hikka_web", None)
+        if web is None:
+            return None
+
+        try:
+            await asyncio.wait_for(web.running.wait(), timeout=WEB_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+
+        return web
+
+    def _measure_updates(self):
+        """Collect processing time of updates, received by bot"""
+        process_update = self._dp.process_update
+
+        async def measured(update: Update):
+            with self._allmodules.stats.measure(
+                "update",
+                process_update,
+                owner=("InlineManager", self.update_transport),
+            ):
+                return await process_update(update)
+
+        # Dispatcher passes all updates (both polled and posted to
+        # webhook) through `updates_handler`, so it's replaced there
+        handlers = self._dp.updates_handler.handlers
+        for index, handler in enumerate(handlers):
+            if handler.handler == process_update:
+                handlers.remove(handler)
+                self._dp.updates_handler.register(measured, index=index)
+                break
+
+    async def _process_webhook_update(self, data: dict):
+        # Each update is processed in its own task, so
+        # the context of bot must be set here
+        Bot.set_current(self.bot)
+        Dispatcher.set_current(self._dp)
+
+        try:
+            await self._dp.updates_handler.notify(Update.to_object(data))
+        except Exception:
+            logger.exception("Error while processing webhook update")
+
+    async def _relay_updates(self, url: str):
+        """Fetch updates by polling and post them to local webhook"""
+        offset = None
+        backoff = 1
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    updates = await self.bot.get_updates(offset=offset, timeout=20)
+                except (TerminatedByOtherGetUpdates, Unauthorized):
+                    raise
+                except RetryAfter as e:
+                    await asyncio.sleep(e.timeout)
+                    continue
+                except Exception:
+                    # Network errors and timeouts must not stop receiving
+                    # updates, the same way as aiogram's polling retries them
+                    logger.debug("Can't get updates, retrying", exc_info=True)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RELAY_MAX_BACKOFF)
+                    continue
+
+                backoff = 1
+                for update in updates or []:
+                    offset = update.update_id + 1
+                    try:
+                        async with session.post(url, json=update.to_python()):
+                            pass
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        logger.debug(
+                            "Can't post update to local webhook",
+                            exc_info=True,
+                        )
+
+                if updates is None:
+                    # Request failed, don't spam with retries
+                    await asyncio.sleep(5)
+
+    async def _receive_updates(self):
+        """Start receiving updates in the configured mode"""
+        mode = self._db.get("hikka.inline", "webhook", "off")
+        self._measure_updates()
+
+        web = await self._get_web() if mode != "off" else None
+        if mode != "off" and web is None:
+            logger.warning("Web server is not running, using polling for inline bot")
+            mode = "off"
+
+        if mode == "on" and not self._get_webhook_base():
+            logger.warning(
+                "Public url for webhook is not set (`WEBHOOK_URL`), using polling"
+                " for inline bot"
+            )
+            mode = "off"
+
+        if mode == "on":
+            url = f"{self._get_webhook_base()}/webhook/{self._webhook_secret}"
+            # Telegram may post updates right after webhook is set
+            web.register_webhook(self._webhook_secret, self._process_webhook_update)
+            try:
+                await self.bot.set_webhook(url)
+            except Exception:
+                logger.exception("Can't set webhook, using polling for inline bot")
+                web.unregister_webhook(self._webhook_secret)
+                mode = "off"
+            else:
+                self._db.set("hikka.inline", "webhook_set", True)
+                self.update_transport = "webhook"
+                logger.debug(f"Inline bot receives updates via webhook {url}")
+                return
+
+        if self._db.get("hikka.inline", "webhook_set", False):
+            # Telegram refuses `getUpdates`, while webhook is set
+            await self.bot.delete_webhook()
+            self._db.set("hikka.inline", "webhook_set", False)
+
+        if mode == "local":
+            web.register_webhook(self._webhook_secret, self._process_webhook_update)
+            self.update_transport = "local"
+            await self._relay_updates(
+                f"http://127.0.0.1:{web.port}/webhook/{self._webhook_secret}"
+            )
+            return
+
+        self.update_transport = "polling"
+        await self._dp.start_polling()
+
+    def _stop_receiving_updates(self):
+        web = getattr(self._client, "hikka_web", None)
+        if web is not None and self._token:
+            web.unregister_webhook(self._webhook_secret)
+
+        self._dp.stop_polling()
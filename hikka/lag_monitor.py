@@ -0,0 +1,174 @@
+"""Detects event loop stalls and finds out, which module caused them"""
+
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from ._types import Module
+
+logger = logging.getLogger(__name__)
+
+Stall = collections.namedtuple(
+    "Stall",
+    ["time", "duration", "owner", "client_id", "stack"],
+)
+
+
+def _attribute(frame) -> tuple:
+    """
+    Walk the stack from the innermost frame and find the module, which owns it
+    :param frame: Innermost frame of the blocked thread
+    :return: Tuple of owner (`Module.function` or python module name) and client id
+    """
+    owner = None
+    fallback = None
+    client_id = None
+
+    while frame is not None:
+        code = frame.f_code
+
+        if owner is None and "self" in code.co_varnames:
+            instance = frame.f_locals.get("self")
+            if isinstance(instance, Module):
+                owner = f"{instance.__class__.__name__}.{code.co_name}"
+
+        if fallback is None and frame.f_globals.get("__name__", "").startswith(
+            "hikka.modules."
+        ):
+            fallback = f"{frame.f_globals['__name__']}.{code.co_name}"
+
+        if client_id is None and "_hikka_client_id_logging_tag" in code.co_varnames:
+            tag = frame.f_locals.get("_hikka_client_id_logging_tag")
+            if isinstance(tag, int):
+                client_id = tag
+
+        frame = frame.f_back
+
+    return owner or fallback or "<unknown>", client_id
+
+
+class LagMonitor:
+    """
+    Measures the scheduling delay of event loop. Heartbeat coroutine
+    wakes up every `interval` seconds, while the watchdog thread samples
+    the stack of loop thread, if heartbeat didn't happen in time
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        threshold: float = 0.5,
+        interval: float = 0.1,
+        report_cooldown: int = 300,
+    ):
+        """
+        :param loop: Event loop to monitor
+        :param threshold: Minimal stall duration in seconds to report
+        :param interval: Heartbeat interval in seconds
+        :param report_cooldown: Do not report stalls of the same owner more often
+        """
+        self._loop = loop
+        self.threshold = threshold
+        self.interval = interval
+        self.report_cooldown = report_cooldown
+        self.stalls = collections.deque(maxlen=50)
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._samples = []
+        self._lock = threading.Lock()
+        self._loop_thread_id = None
+        self._reported = {}
+        self._task = None
+
+    def start(self):
+        """Schedule heartbeat and start the watchdog thread"""
+        self._task = self._loop.create_task(self._heartbeat())
+        threading.Thread(
+            target=self._watchdog,
+            name="hikka-lag-monitor",
+            daemon=True,
+        ).start()
+
+    async def _heartbeat(self):
+        self._loop_thread_id = threading.get_ident()
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = now - start - self.interval
+            self.max_lag = max(self.max_lag, lag)
+
+            with self._lock:
+                samples, self._samples = self._samples, []
+
+            if lag >= self.threshold and samples:
+                self._report(lag, samples)
+
+    def _watchdog(self):
+        while True:
+            time.sleep(self.interval / 2)
+            if (
+                self._loop_thread_id is None
+                or time.monotonic() - self._beat < self.interval + self.threshold
+            ):
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)  # skipcq
+            if frame is None:
+                continue
+
+            owner, client_id = _attribute(frame)
+            sample = (owner, client_id, traceback.extract_stack(frame, limit=10))
+            del frame
+
+            with self._lock:
+                # Limit the amount of samples of single stall
+                if len(self._samples) < 100:
+                    self._samples += [sample]
+
+    def _report(self, lag: float, samples: list):
+        owners = collections.Counter(sample[0] for sample in samples)
+        owner = owners.most_common(1)[0][0]
+        _, client_id, stack = next(
+            sample for sample in reversed(samples) if sample[0] == owner
+        )
+
+        self.stalls.append(Stall(time.time(), lag, owner, client_id, stack))
+
+        if time.time() - self._reported.get(owner, 0) < self.report_cooldown:
+            return
+
+        self._reported[owner] = time.time()
+
+        # Will be used to determine, which client caused logging messages
+        # parsed via inspect.stack()
+        _hikka_client_id_logging_tag = client_id  # skipcq
+
+        logger.warning(
+            f"Event loop was blocked for {round(lag * 1000)} ms by {owner}\n"
+            + "".join(traceback.format_list(stack))
+        )
+
+    def summary(self, owner: Optional[str] = None) -> list:
+        """Get recorded stalls, optionally filtered by owner"""
+        return [
+            stall
+            for stall in self.stalls
+            if owner is None or stall.owner.lower().startswith(owner.lower())
+        ]
@@ -0,0 +1,212 @@
+"""Placeholders for modules, which are executed only on first use"""
+
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import ast
+import collections
+import logging
+from typing import Optional
+
+from . import security
+from ._types import Module
+
+logger = logging.getLogger(__name__)
+
+LazyIndex = collections.namedtuple("LazyIndex", ["classname", "name", "doc", "methods"])
+LazyMethod = collections.namedtuple("LazyMethod", ["name", "doc", "decorators"])
+
+# Decorators, which only set attributes of function, so they can be
+# applied to placeholders without executing the module
+SAFE_DECORATORS = {
+    "owner",
+    "sudo",
+    "support",
+    "group_owner",
+    "group_admin_add_admins",
+    "group_admin_change_info",
+    "group_admin_ban_users",
+    "group_admin_delete_messages",
+    "group_admin_pin_messages",
+    "group_admin_invite_users",
+    "group_admin",
+    "group_member",
+    "pm",
+    "unrestricted",
+    "inline_everyone",
+    "ratelimit",
+}
+
+# Methods, which must be running all the time, so such modules can't be lazy
+EAGER_METHODS = {"watcher", "aiogram_watcher"}
+
+# Calls in `client_ready`, which mean, that module starts some background work
+EAGER_CALLS = {"ensure_future", "create_task", "add_event_handler", "start"}
+
+ENTRY_POINTS = ("cmd", "_inline_handler", "_callback_handler")
+
+
+def _decorator_name(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Attribute):
+        return node.attr
+
+    if isinstance(node, ast.Name):
+        return node.id
+
+    # Decorators with arguments (e.g. `loader.loop(...)`) can't be indexed
+    return None
+
+
+def _is_module_class(node: ast.ClassDef) -> bool:
+    return any(
+        (_decorator_name(base) or "").endswith("Module") for base in node.bases
+    )
+
+
+def _get_name(node: ast.ClassDef) -> Optional[str]:
+    """Get `strings["name"]` of module, if it's a literal"""
+    for item in node.body:
+        if (
+            isinstance(item, ast.Assign)
+            and any(
+                isinstance(target, ast.Name) and target.id == "strings"
+                for target in item.targets
+            )
+            and isinstance(item.value, ast.Dict)
+        ):
+            for key, value in zip(item.value.keys, item.value.values):
+                if (
+                    isinstance(key, ast.Constant)
+                    and key.value == "name"
+                    and isinstance(value, ast.Constant)
+                    and isinstance(value.value, str)
+                ):
+                    return value.value
+
+    return None
+
+
+def index(source: str) -> Optional[LazyIndex]:
+    """
+    Find the entry points of module without executing it
+    :param source: Source code of module
+    :return: Index of module or `None`, if module must be loaded eagerly
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+
+    classes = [
+        node
+        for node in tree.body
+        if isinstance(node, ast.ClassDef) and _is_module_class(node)
+    ]
+
+    if len(classes) != 1:
+        return None
+
+    cls = classes[0]
+    name = _get_name(cls)
+    if name is None:
+        return None
+
+    methods = []
+    for item in cls.body:
+        if not isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+
+        if item.name in EAGER_METHODS:
+            return None
+
+        decorators = [_decorator_name(decorator) for decorator in item.decorator_list]
+
+        if item.name == "client_ready" and any(
+            _decorator_name(node.func) in EAGER_CALLS
+            for node in ast.walk(item)
+            if isinstance(node, ast.Call)
+        ):
+            return None
+
+        if not item.name.endswith(ENTRY_POINTS):
+            if "loop" in decorators:
+                return None
+
+            continue
+
+        if any(decorator not in SAFE_DECORATORS for decorator in decorators):
+            return None
+
+        methods += [LazyMethod(item.name, ast.get_docstring(item), decorators)]
+
+    if not methods:
+        return None
+
+    return LazyIndex(cls.name, name, ast.get_docstring(cls), methods)
+
+
+class LazyModule(Module):
+    """Placeholder of module, which will be executed on the first use"""
+
+    _lazy_spec = None
+    _lazy_real = None
+    _lazy_lock = None
+
+    async def _lazy_activate(self) -> Module:
+        return await self.allmodules.activate_lazy(self)
+
+
+def _make_stub(method: LazyMethod, module_name: str) -> callable:
+    async def stub(self, *args, **kwargs):
+        real = await self._lazy_activate()
+        return await getattr(real, method.name)(*args, **kwargs)
+
+    stub.__name__ = stub.__qualname__ = method.name
+    stub.__doc__ = method.doc
+    stub.__module__ = module_name
+
+    # Decorators are applied bottom-up, the same way as in the source code
+    for decorator in reversed(method.decorators):
+        if decorator == "ratelimit":
+            stub.ratelimit = True
+        else:
+            stub = getattr(security, decorator)(stub)
+
+    return stub
+
+
+def make_placeholder(
+    module_index: LazyIndex,
+    module_name: str,
+    spec: "ModuleSpec",  # type: ignore
+) -> LazyModule:
+    """
+    Create placeholder instance, which exposes commands and handlers of module
+    :param module_index: Result of `index`
+    :param module_name: Full name of module (e.g. `hikka.modules.example`)
+    :param spec: Spec, which will be used to load the real module
+    """
+    cls = type(
+        module_index.classname,
+        (LazyModule,),
+        {
+            "__module__": module_name,
+            "__doc__": module_index.doc,
+            "strings": {"name": module_index.name},
+            **{
+                method.name: _make_stub(method, module_name)
+                for method in module_index.methods
+            },
+        },
+    )
+
+    instance = cls()
+    instance._lazy_spec = spec
+    return instance
@@ -30,20 +30,23 @@ import asyncio
 import contextlib
 import copy
 import functools
+import hashlib
 import importlib
 import importlib.util
 import inspect
 import logging
+import marshal
 import re
 import os
 import sys
 from importlib.abc import SourceLoader
 from importlib.machinery import ModuleSpec
-from types import FunctionType
+from importlib.util import MAGIC_NUMBER
+from types import FunctionType, MethodType
 from typing import Any, Optional, Union, List
 from telethon.tl.types import Message
 
-from . import security, utils, validators
+from . import lazy, rpc, security, stats, utils, validators
 from ._types import (
     ConfigValue,  # type: ignore
     LoadError,  # type: ignore
@@ -76,6 +79,10 @@ unrestricted = security.unrestricted
 inline_everyone = security.inline_everyone
 
 
+# Maximum amount of compiled modules to keep in bytecode cache
+BYTECODE_CACHE_SIZE = 256
+
+
 class StringLoader(SourceLoader):
     """Load a python module/file from a string"""
 
@@ -83,13 +90,52 @@ class StringLoader(SourceLoader):
         self.data = data.encode("utf-8") if isinstance(data, str) else data
         self.origin = origin
 
-    def get_code(self, fullname: str) -> str:
-        return (
-            compile(source, self.origin, "exec", dont_inherit=True)
-            if (source := self.get_source(fullname))
-            else None
+    def _cache_path(self) -> str:
+        # Key includes interpreter's magic number, so cache is invalidated on
+        # Python upgrade, and origin, because it's used as code filename
+        key = hashlib.sha256(
+            MAGIC_NUMBER + self.origin.encode("utf-8") + b"\0" + self.data
+        ).hexdigest()
+        return os.path.join(BYTECODE_CACHE_DIR, f"{key}.bin")
+
+    def _compile(self, fullname: str):
+        return compile(
+            self.get_source(fullname),
+            self.origin,
+            "exec",
+            dont_inherit=True,
         )
 
+    def get_code(self, fullname: str) -> str:
+        if not self.data:
+            return None
+
+        if "DYNO" in os.environ:
+            return self._compile(fullname)
+
+        path = self._cache_path()
+
+        with contextlib.suppress(OSError, EOFError, ValueError, TypeError):
+            with open(path, "rb") as f:
+                code = marshal.load(f)
+
+            os.utime(path)
+            return code
+
+        code = self._compile(fullname)
+
+        try:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                marshal.dump(code, f)
+
+            os.replace(tmp, path)
+            _prune_bytecode_cache()
+        except OSError:
+            logger.debug(f"Can't save bytecode cache of {fullname}", exc_info=True)
+
+        return code
+
     def get_filename(self, *args, **kwargs) -> str:
         return self.origin
 
@@ -174,7 +220,15 @@ class InfiniteLoop:
                 break
 
             try:
-                await self.func(self.module_instance, *args, **kwargs)
+                with self.module_instance.allmodules.stats.measure(
+                    "loop",
+                    self.func,
+                    owner=(self.module_instance.__class__.__name__, self.func.__name__),
+                    ignore=(StopLoop,),
+                ), rpc.handler_context(
+                    MethodType(self.func, self.module_instance)
+                ):
+                    await self.func(self.module_instance, *args, **kwargs)
             except StopLoop:
                 break
             except Exception:
@@ -225,9 +279,29 @@ BASE_DIR = (
 )
 
 LOADED_MODULES_DIR = os.path.join(BASE_DIR, "loaded_modules")
+BYTECODE_CACHE_DIR = os.path.join(BASE_DIR, ".bytecode_cache")
+
+if "DYNO" not in os.environ:
+    for directory in (LOADED_MODULES_DIR, BYTECODE_CACHE_DIR):
+        if not os.path.isdir(directory):
+            os.mkdir(directory, mode=0o755)
+
+
+def _prune_bytecode_cache():
+    """Remove least recently used entries, if there are too many of them"""
+    entries = [
+        entry
+        for entry in os.scandir(BYTECODE_CACHE_DIR)
+        if entry.name.endswith(".bin")
+    ]
 
-if not os.path.isdir(LOADED_MODULES_DIR) and "DYNO" not in os.environ:
-    os.mkdir(LOADED_MODULES_DIR, mode=0o755)
+    if len(entries) <= BYTECODE_CACHE_SIZE:
+        return
+
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[: len(entries) - BYTECODE_CACHE_SIZE]:
+        with contextlib.suppress(OSError):
+            os.remove(entry.path)
 
 
 def translatable_docstring(cls):
@@ -273,6 +347,22 @@ def ratelimit(func):
     return func
 
 
+def inline_cache(ttl: int = 60, debounce: float = 0) -> FunctionType:
+    """
+    Cache results of inline handler
+    :param ttl: Time in seconds, during which results for the same query of the same
+                user are reused. Telegram is also allowed to cache them for this time
+    :param debounce: Delay in seconds before running the handler. If user keeps
+                     typing meanwhile, only the latest query is processed
+    """
+
+    def wrapped(func):
+        func.inline_cache = {"ttl": ttl, "debounce": debounce}
+        return func
+
+    return wrapped
+
+
 def get_commands(mod):
     """Introspect the module to get its commands"""
     return {
@@ -321,6 +411,7 @@ class Modules:
         self.watchers = []
         self._log_handlers = []
         self._core_commands = []
+        self.stats = stats.StatsRegistry()
 
     def register_all(self, client, db, mods=None):
         """Load all modules in the module directory"""
@@ -368,11 +459,30 @@ class Modules:
                 logger.debug(f"Loading {module_name} from filesystem")
 
                 with open(mod, "r") as file:
-                    spec = ModuleSpec(
-                        module_name,
-                        StringLoader(file.read(), origin),
-                        origin=origin,
-                    )
+                    source = file.read()
+
+                spec = ModuleSpec(
+                    module_name,
+                    StringLoader(source, origin),
+                    origin=origin,
+                )
+
+                if origin == "<file>" and self._db.get(
+                    "hikka.main",
+                    "lazy_modules",
+                    False,
+                ):
+                    module_index = lazy.index(source)
+                    if module_index is not None:
+                        logger.debug(f"Postponing execution of {module_name}")
+                        placeholder = lazy.make_placeholder(
+                            module_index,
+                            module_name,
+                            spec,
+                        )
+                        self.complete_registration(placeholder)
+                        placeholder.__origin__ = origin
+                        continue
 
                 self.register_module(spec, module_name, origin)
             except BaseException as e:
@@ -603,6 +713,7 @@ class Modules:
 
     def send_config(self, db, translator, skip_hook: bool = False):
         """Configure modules"""
+        self._translator = translator
         for mod in self.modules:
             self.send_config_one(mod, db, translator, skip_hook)
 
@@ -641,6 +752,13 @@ class Modules:
                 logger.warning(
                     f"Got invalid config instance. Expected `ModuleConfig`, got {type(mod.config)=}, {mod.config=}"
                 )
+            else:
+                for config in getattr(mod.config, "_config", {}).values():
+                    config._on_change = functools.partial(
+                        self._save_config_value,
+                        db,
+                        mod.__class__.__name__,
+                    )
 
         if skip_hook:
             return
@@ -659,9 +777,21 @@ class Modules:
             logger.exception(f"Failed to send mod config complete signal due to {e}")
             raise
 
+    @staticmethod
+    def _save_config_value(
+        db: "Database",  # type: ignore
+        owner: str,
+        config: ConfigValue,
+    ):
+        db.setdefault(owner, {}).setdefault("__config__", {})[
+            config.option
+        ] = config.value
+        db.schedule_save()
+
     async def send_ready(self, client, db, allclients):
         """Send all data to all modules"""
         self.client = client
+        self._allclients = allclients
 
         # Init inline manager anyway, so the modules
         # can access its `init_complete`
@@ -725,7 +855,7 @@ class Modules:
                         reply_markup={"text": "\u0020\u2800", "data": "empty"},
                     )
                 else:
-                    message = await utils.answer(message, frame)
+                    message = await utils.answer(message, frame, coalesce=True)
             elif isinstance(message, InlineMessage) and inline:
                 await message.edit(frame)
 
@@ -771,7 +901,8 @@ class Modules:
                 logger.info("Can't process `on_dlmod` hook", exc_info=True)
 
         try:
-            await mod.client_ready(client, db)
+            with rpc.handler_context(mod.client_ready):
+                await mod.client_ready(client, db)
         except SelfUnload as e:
             if no_self_unload:
                 raise e
@@ -799,6 +930,40 @@ class Modules:
         if not self._initial_registration and self.added_modules:
             await self.added_modules(self)
 
+    async def activate_lazy(self, placeholder: "lazy.LazyModule") -> Module:
+        """
+        Execute the real module, replacing its placeholder
+        :param placeholder: Placeholder, created on registration
+        :return: Instance of the real module
+        """
+        if placeholder._lazy_real is not None:
+            return placeholder._lazy_real
+
+        if placeholder._lazy_lock is None:
+            placeholder._lazy_lock = asyncio.Lock()
+
+        async with placeholder._lazy_lock:
+            if placeholder._lazy_real is not None:
+                return placeholder._lazy_real
+
+            with contextlib.suppress(AttributeError):
+                _hikka_client_id_logging_tag = copy.copy(self.client._tg_id)
+
+            spec = placeholder._lazy_spec
+            logger.debug(f"Activating {spec.name} on first use")
+
+            instance = self.register_module(spec, spec.name, spec.origin)
+            self.send_config_one(instance, self._db, self._translator)
+            await self.send_ready_one(
+                instance,
+                self.client,
+                self._db,
+                self._allclients,
+            )
+
+            placeholder._lazy_real = instance
+            return instance
+
     def get_classname(self, name: str) -> str:
         return next(
             (
@@ -11,8 +11,9 @@ import random
 import socket
 import sqlite3
 import sys
+import time
 from math import ceil
-from typing import Union
+from typing import Optional, Union
 
 from telethon import TelegramClient, events
 from telethon.errors.rpcerrorlist import (
@@ -26,9 +27,11 @@ from telethon.network.connection import (
 )
 from telethon.sessions import SQLiteSession, StringSession, MemorySession
 
-from . import database, loader, utils, heroku
+from . import database, loader, rpc, utils, heroku
 from .dispatcher import CommandDispatcher
 from .translations import Translator
+from .lag_monitor import LagMonitor
+from .supervisor import Supervisor
 from .version import __version__
 from .entity_cache import install_entity_caching
 
@@ -205,6 +208,47 @@ def parse_arguments() -> dict:
         action="store_true",
         help="Disable `force_insecure` warning",
     )
+    parser.add_argument(
+        "--supervisor",
+        dest="supervisor",
+        action="store_true",
+        help=(
+            "Run each group of accounts in a separate process. Web interface is"
+            " not shared between processes: it's served only by the first one,"
+            " so only its accounts can be managed from it and use inline bot"
+            " webhooks, the other ones use polling"
+        ),
+    )
+    parser.add_argument(
+        "--sessions-per-worker",
+        dest="sessions_per_worker",
+        action="store",
+        default=1,
+        type=int,
+        help="How many accounts are served by one process in supervisor mode",
+    )
+    parser.add_argument(
+        "--session",
+        dest="sessions",
+        action="append",
+        help="Serve only sessions with this name (e.g. hikka-123456)",
+    )
+    parser.add_argument(
+        "--parallel-startup",
+        dest="parallel_startup",
+        action="store",
+        default=4,
+        type=int,
+        help="How many accounts can be connected and loaded at once",
+    )
+    parser.add_argument(
+        "--lag-threshold",
+        dest="lag_threshold",
+        action="store",
+        default=500,
+        type=int,
+        help="Report event loop stalls longer than this amount of ms. 0 to disable",
+    )
     arguments = parser.parse_args()
     logging.debug(arguments)
     if sys.platform == "win32":
@@ -217,26 +261,60 @@ def parse_arguments() -> dict:
 class SuperList(list):
     """
     Makes able: await self.allclients.send_message("foo", "bar")
+    Coroutine methods are called on all clients concurrently. Result is the list
+    of per-client results in the same order, where failed calls are represented
+    with the exceptions they raised
     """
 
-    def __getattribute__(self, attr):
-        if hasattr(list, attr):
-            return list.__getattribute__(self, attr)
+    def __init__(self, *args, concurrency: Optional[int] = None):
+        """
+        :param concurrency: Maximum amount of clients to run coroutine methods on at once
+        """
+        super().__init__(*args)
+        self.concurrency = concurrency
+        self._wrappers = {}
 
-        for obj in self:  # TODO: find other way
-            attribute = getattr(obj, attr)
-            if callable(attribute):
-                if asyncio.iscoroutinefunction(attribute):
+    def __getattr__(self, attr: str):
+        # Called only if the attribute was not found in list itself
+        if attr.startswith("__") or attr in {"concurrency", "_wrappers"}:
+            raise AttributeError(attr)
 
-                    async def foobar(*args, **kwargs):
-                        return [await getattr(_, attr)(*args, **kwargs) for _ in self]
+        if not self:
+            return []
 
-                    return foobar
-                return lambda *args, **kwargs: [
-                    getattr(_, attr)(*args, **kwargs) for _ in self
-                ]
+        if attr in self._wrappers:
+            return self._wrappers[attr]
+
+        attribute = getattr(self[0], attr)
+        if not callable(attribute):
+            return [getattr(obj, attr) for obj in self]
 
-            return [getattr(x, attr) for x in self]
+        if asyncio.iscoroutinefunction(attribute):
+
+            async def wrapper(*args, **kwargs):
+                semaphore = (
+                    asyncio.Semaphore(self.concurrency) if self.concurrency else None
+                )
+
+                async def call(obj):
+                    if semaphore is None:
+                        return await getattr(obj, attr)(*args, **kwargs)
+
+                    async with semaphore:
+                        return await getattr(obj, attr)(*args, **kwargs)
+
+                return await asyncio.gather(
+                    *[call(obj) for obj in self],
+                    return_exceptions=True,
+                )
+
+        else:
+
+            def wrapper(*args, **kwargs):
+                return [getattr(obj, attr)(*args, **kwargs) for obj in self]
+
+        self._wrappers[attr] = wrapper
+        return wrapper
 
 
 class InteractiveAuthRequired(Exception):
@@ -298,7 +376,12 @@ class Hikka:
                 )
             )
             for session in filter(
-                lambda f: f.startswith("hikka-") and f.endswith(".session"),
+                lambda f: f.startswith("hikka-")
+                and f.endswith(".session")
+                and (
+                    not self.arguments.sessions
+                    or f.rsplit(".session", maxsplit=1)[0] in self.arguments.sessions
+                ),
                 os.listdir(self.arguments.data_root or BASE_DIR),
             )
         ]
@@ -470,7 +553,39 @@ class Hikka:
         Reads session from disk and inits them
         :returns: `True` if at least one client started successfully
         """
-        for session in self.sessions.copy():
+        semaphore = asyncio.Semaphore(max(self.arguments.parallel_startup, 1))
+        auth_lock = asyncio.Lock()
+        results = self.loop.run_until_complete(
+            asyncio.gather(
+                *[
+                    self._init_client(session, semaphore, auth_lock)
+                    for session in self.sessions.copy()
+                ]
+            )
+        )
+
+        if not all(results):
+            return False
+
+        # Clients are added in order of connection, restore the order of sessions
+        order = {id(session): index for index, session in enumerate(self.sessions)}
+        self.clients.sort(key=lambda client: order.get(id(client.session), len(order)))
+
+        return bool(self.sessions)
+
+    async def _init_client(
+        self,
+        session,
+        semaphore: asyncio.Semaphore,
+        auth_lock: asyncio.Lock,
+    ) -> bool:
+        """
+        Connects and authorizes single session
+        :param auth_lock: Lock, which lets only one session ask for credentials
+            in terminal at once
+        :returns: `False` if API credentials are invalid
+        """
+        async with semaphore:
             try:
                 client = TelegramClient(
                     session,
@@ -482,7 +597,24 @@ class Hikka:
                     device_model="Hikka",
                 )
 
-                client.start(phone=raise_auth if self.web else lambda: input("Phone: "))
+                if self.web:
+                    await client.start(phone=raise_auth)
+                else:
+                    await client.connect()
+                    if await client.is_user_authorized():
+                        await client.start()
+                    else:
+                        # Prompts block event loop, so they are shown one
+                        # session at a time
+                        name = (
+                            os.path.basename(session.filename).rsplit(".session")[0]
+                            if isinstance(session, SQLiteSession)
+                            else "hikka_session"
+                        )
+                        async with auth_lock:
+                            await client.start(
+                                phone=lambda: input(f"Phone for {name}: ")
+                            )
 
                 client.phone = "never gonna give you up"
 
@@ -494,7 +626,6 @@ class Hikka:
                     "Check that this is the only instance running. "
                     f"If that doesn't help, delete the file named '{session}'"
                 )
-                continue
             except (TypeError, AuthKeyDuplicatedError):
                 os.remove(os.path.join(BASE_DIR, f"{session}.session"))
                 self.sessions.remove(session)
@@ -512,16 +643,21 @@ class Hikka:
                 print(f"Session {session} was terminated and re-auth is required")
                 self.sessions.remove(session)
 
-        return bool(self.sessions)
+        return True
 
     def _init_loop(self):
         """Initializes main event loop and starts handler for each client"""
+        # Limits the amount of clients, which are loading modules at once
+        self._startup_semaphore = asyncio.Semaphore(
+            max(self.arguments.parallel_startup, 1)
+        )
         loops = [self.amain_wrapper(client) for client in self.clients]
         self.loop.run_until_complete(asyncio.gather(*loops))
 
     async def amain_wrapper(self, client):
         """Wrapper around amain"""
         async with client:
+            rpc.get_chain(client)
             first = True
             client._tg_id = (await client.get_me()).id
             while await self.amain(first, client):
@@ -562,7 +698,10 @@ class Hikka:
                 )
                 self.omit_log = True
 
-            print(f"- Started for {client._tg_id} -")
+            print(
+                f"- Started for {client._tg_id} in"
+                f" {client._hikka_startup_time:.2f}s -"
+            )
         except Exception:
             logging.exception("Badge error")
 
@@ -597,11 +736,33 @@ class Hikka:
         """Entrypoint for async init, run once for each user"""
         web_only = self.arguments.web_only
         client.parse_mode = "HTML"
+
+        async with self._startup_semaphore:
+            # Time, spent waiting for other clients, is not counted
+            client._hikka_startup_started = time.perf_counter()
+            if not await self._amain_startup(first, client, web_only):
+                return  # We are done
+
+        await client.run_until_disconnected()
+
+    async def _amain_startup(self, first, client, web_only) -> bool:
+        """
+        Loads database and modules of client
+        :returns: `False` if userbot must not continue running
+        """
         await client.start()
 
         db = database.Database(client)
+        # Let `utils.asset_channel` remember found channels
+        client.hikka_db = db
+        # Let inline bot receive updates via webhook
+        client.hikka_web = self.web
         await db.init()
 
+        rpc.get_chain(client).set_cache_ttls(
+            db.get(__name__, "request_cache_ttls", {})
+        )
+
         logging.debug("Got DB")
         logging.debug("Loading logging config...")
 
@@ -615,7 +776,7 @@ class Hikka:
 
         if self.arguments.docker_deps_internal:
             # Loader has installed all dependencies
-            return  # We are done
+            return False
 
         if self.web:
             await self.web.add_loader(client, modules, db)
@@ -631,10 +792,14 @@ class Hikka:
         modules.send_config(db, translator)
         await modules.send_ready(client, db, self.clients)
 
+        client._hikka_startup_time = (
+            time.perf_counter() - client._hikka_startup_started
+        )
+
         if first:
             await self._badge(client)
 
-        await client.run_until_disconnected()
+        return True
 
     def main(self):
         """Main entrypoint"""
@@ -668,6 +833,22 @@ class Hikka:
             # authentication
             return
 
+        if self.arguments.supervisor:
+            sessions = [
+                os.path.basename(session.filename).rsplit(".session", maxsplit=1)[0]
+                for session in self.sessions
+                if isinstance(session, SQLiteSession)
+            ]
+
+            if sessions:
+                Supervisor(self.arguments, sessions, sys.argv[1:]).run(self.loop)
+                return
+
+            logging.warning(
+                "There are no session files to distribute between workers, "
+                "running in single process mode"
+            )
+
         self._init_web()
         save_config_key("port", self.arguments.port)
         self._get_token()
@@ -686,6 +867,13 @@ class Hikka:
             )
         )
 
+        if self.arguments.lag_threshold > 0:
+            self.lag_monitor = LagMonitor(
+                self.loop,
+                threshold=self.arguments.lag_threshold / 1000,
+            )
+            self.lag_monitor.start()
+
         self._init_loop()
 
 
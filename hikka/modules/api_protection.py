@@ -19,12 +19,53 @@ import time
 
 from telethon.tl.types import Message
 
-from .. import loader, utils
+from .. import loader, rpc, utils
 from ..inline.types import InlineCall
 
 logger = logging.getLogger(__name__)
 
 
+class SlidingWindow:
+    """
+    Counts events in the last `size` seconds. Events are stored in the
+    ring buffer of one-second buckets, so each hit is O(1) amortized
+    """
+
+    __slots__ = ("size", "buckets", "total", "last")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.buckets = [0] * size
+        self.total = 0
+        self.last = int(time.monotonic())
+
+    def _expire(self, now: int):
+        if now - self.last >= self.size:
+            self.buckets = [0] * self.size
+            self.total = 0
+        else:
+            for tick in range(self.last + 1, now + 1):
+                slot = tick % self.size
+                self.total -= self.buckets[slot]
+                self.buckets[slot] = 0
+
+        self.last = max(self.last, now)
+
+    def hit(self, now: int) -> int:
+        """
+        Register event and get the amount of events in window
+        :param now: Current `time.monotonic()`, rounded down
+        """
+        self._expire(now)
+        self.buckets[now % self.size] += 1
+        self.total += 1
+        return self.total
+
+    def count(self, now: int) -> int:
+        self._expire(now)
+        return self.total
+
+
 @loader.tds
 class APIRatelimiterMod(loader.Module):
     """Helps userbot avoid spamming Telegram API"""
@@ -35,7 +76,7 @@ class APIRatelimiterMod(loader.Module):
             "🚫 <b>WARNING!</b>\n\n"
             "Your account exceeded the limit of requests, "
             "specified in config. In order to prevent "
-            "Telegram API Flood, userbot has been <b>fully frozen</b> "
+            "Telegram API Flood, requests of <code>{}</code> have been <b>frozen</b> "
             "for {} seconds. Further info is provided in attached file. \n\n"
             "It is recommended to get help in <code>{prefix}support</code> group!\n\n"
             "If you think, that it is an intended behavior, then wait until userbot gets unlocked "
@@ -54,7 +95,7 @@ class APIRatelimiterMod(loader.Module):
         "warning": (
             "🚫 <b>ВНИМАНИЕ!</b>\n\n"
             "Аккаунт вышел за лимиты запросов, указанные в конфиге. "
-            "С целью предотвращения флуда Telegram API, юзербот был <b>полностью заморожен</b> "
+            "С целью предотвращения флуда Telegram API, запросы <code>{}</code> были <b>заморожены</b> "
             "на {} секунд. Дополнительная информация прикреплена в файле ниже. \n\n"
             "Рекомендуется обратиться за помощью в <code>{prefix}support</code> группу!\n\n"
             "Если ты считаешь, что это запланированное поведение юзербота, просто подожди, пока закончится таймер "
@@ -69,9 +110,7 @@ class APIRatelimiterMod(loader.Module):
         "u_sure": "⚠️ <b>Ты уверен?</b>",
     }
 
-    _ratelimiter = []
     _suspend_until = 0
-    _lock = False
 
     def __init__(self):
         self.config = loader.ModuleConfig(
@@ -93,7 +132,29 @@ class APIRatelimiterMod(loader.Module):
                 lambda: "Local FW DO NOT TOUCH",
                 validator=loader.validators.Integer(minimum=10, maximum=3600),
             ),
+            loader.ConfigValue(
+                "budgets",
+                [
+                    "SendMessageRequest:40",
+                    "EditMessageRequest:40",
+                    "ForwardMessagesRequest:20",
+                    "DeleteMessagesRequest:30",
+                    "JoinChannelRequest:5",
+                    "ImportChatInviteRequest:5",
+                    "InviteToChannelRequest:10",
+                ],
+                lambda: "Per-request budgets in time sample (RequestName:limit)",
+                validator=loader.validators.Series(
+                    validator=loader.validators.RegExp(r"^[A-Za-z]+Request:\d+$")
+                ),
+            ),
         )
+        self._windows = {}
+        self._window_size = None
+        self._total = None
+        self._budgets = {}
+        self._budgets_source = None
+        self._penalties = {}
 
     async def client_ready(self, client, db):
         self._client = client
@@ -101,69 +162,121 @@ class APIRatelimiterMod(loader.Module):
 
     async def _install_protection(self):
         await asyncio.sleep(30)  # Restart lock
-        if hasattr(self._client._call, "_old_call_rewritten"):
+        chain = rpc.get_chain(self._client)
+        if "APIRatelimiter" in chain:
             raise loader.SelfUnload("Already installed")
 
-        old_call = self._client._call
+        chain.add(rpc.Middleware("APIRatelimiter", pre=self._check, priority=-10))
+        logger.debug("Successfully installed ratelimiter")
 
-        async def new_call(
-            sender: "MTProtoSender",  # type: ignore
-            request: "TLRequest",  # type: ignore
-            ordered: bool = False,
-            flood_sleep_threshold: int = None,
+    async def _check(
+        self,
+        client: "TelegramClient",  # type: ignore
+        request: "TLRequest",  # type: ignore
+    ) -> "TLRequest":  # type: ignore
+        if time.perf_counter() > self._suspend_until and not self.get(
+            "disable_protection",
+            True,
         ):
-            if time.perf_counter() > self._suspend_until and not self.get(
-                "disable_protection",
-                True,
-            ):
-                request_name = type(request).__name__
-                self._ratelimiter += [[request_name, time.perf_counter()]]
-
-                self._ratelimiter = list(
-                    filter(
-                        lambda x: time.perf_counter() - x[1]
-                        < int(self.config["time_sample"]),
-                        self._ratelimiter,
-                    )
+            await self._protect(type(request).__name__)
+
+        return request
+
+    def _refresh_limits(self):
+        size = int(self.config["time_sample"])
+        if size != self._window_size:
+            self._window_size = size
+            self._windows = {}
+            self._total = SlidingWindow(size)
+
+        if self.config["budgets"] is not self._budgets_source:
+            self._budgets_source = self.config["budgets"]
+            self._budgets = {
+                name: int(limit)
+                for name, limit in (
+                    budget.split(":") for budget in self._budgets_source
                 )
+            }
 
-                if (
-                    len(self._ratelimiter) > int(self.config["threshold"])
-                    and not self._lock
-                ):
-                    self._lock = True
-                    report = io.BytesIO(
-                        json.dumps(
-                            self._ratelimiter,
-                            indent=4,
-                        ).encode("utf-8")
-                    )
-                    report.name = "local_fw_report.json"
-
-                    await self.inline.bot.send_document(
-                        self._tg_id,
-                        report,
-                        caption=self.strings("warning").format(
-                            self.config["local_floodwait"],
-                            prefix=self.get_prefix(),
-                        ),
-                    )
-
-                    # It is intented to use time.sleep instead of asyncio.sleep
-                    time.sleep(int(self.config["local_floodwait"]))
-                    self._lock = False
-
-            return await old_call(sender, request, ordered, flood_sleep_threshold)
-
-        self._client._call = new_call
-        self._client._old_call_rewritten = old_call
-        self._client._call._hikka_overwritten = True
-        logger.debug("Successfully installed ratelimiter")
+    async def _protect(self, request_name: str):
+        self._refresh_limits()
+        now = int(time.monotonic())
+
+        if request_name not in self._windows:
+            self._windows[request_name] = SlidingWindow(self._window_size)
+
+        count = self._windows[request_name].hit(now)
+        total = self._total.hit(now)
+
+        caller = None
+        if self._penalties:
+            caller = rpc.get_caller(ignore={"APIRatelimiterMod"})
+            caller = caller and caller.__class__.__name__
+            await self._wait_penalty(caller, request_name)
+
+        if total <= int(self.config["threshold"]) and count <= self._budgets.get(
+            request_name,
+            count,
+        ):
+            return
+
+        if caller is None:
+            caller = rpc.get_caller(ignore={"APIRatelimiterMod"})
+            caller = caller and caller.__class__.__name__
+
+        key = caller or request_name
+        if key in self._penalties:
+            return
+
+        self._penalties[key] = time.monotonic() + int(self.config["local_floodwait"])
+
+        report = io.BytesIO(
+            json.dumps(
+                {
+                    "caller": caller,
+                    "request": request_name,
+                    "time_sample": self._window_size,
+                    "total": total,
+                    "requests": {
+                        name: window.count(now)
+                        for name, window in self._windows.items()
+                        if window.count(now)
+                    },
+                },
+                indent=4,
+            ).encode("utf-8")
+        )
+        report.name = "local_fw_report.json"
+
+        asyncio.ensure_future(
+            self.inline.bot.send_document(
+                self._tg_id,
+                report,
+                caption=self.strings("warning").format(
+                    key,
+                    self.config["local_floodwait"],
+                    prefix=self.get_prefix(),
+                ),
+            )
+        )
+
+        await self._wait_penalty(caller, request_name)
+
+    async def _wait_penalty(self, caller: str, request_name: str):
+        """Delay the request only if its caller or type is penalized"""
+        for key in (caller, request_name):
+            if key not in self._penalties:
+                continue
+
+            delay = self._penalties[key] - time.monotonic()
+            if delay <= 0:
+                del self._penalties[key]
+                continue
+
+            await asyncio.sleep(delay)
 
     async def on_unload(self):
-        if hasattr(self._client, "_old_call_rewritten"):
-            self._client._call = self._client._old_call_rewritten
-            delattr(self._client, "_old_call_rewritten")
+        if rpc.get_chain(self._client).remove("APIRatelimiter"):
             logger.debug("Successfully uninstalled ratelimiter")
 
     async def suspend_api_protectcmd(self, message: Message):
@@ -1,11 +1,14 @@
 import asyncio
 import datetime
+import gzip
+import hashlib
 import io
 import json
 import logging
 import time
+from typing import Optional
 from telethon.tl.types import Message
-from .. import loader, utils
+from .. import codec, loader, utils
 from ..inline.types import InlineCall
 
 logger = logging.getLogger(__name__)
@@ -23,6 +26,15 @@ class BackupMod(loader.Module):
         "saved": soso + "Backup period saved. You can re-configure it later with .set_backup_period",
         "never": soso + "I will not make automatic backups. You can re-configure it later with .set_backup_period",
         "invalid_args": soso + "<b>Specify correct backup period in hours, or `0` to disable</b>",
+        "incremental_doc": "Upload only changed part of database against the last full backup",
+        "full_every_doc": "Make full backup after this amount of incremental ones",
+        "reply_to_backup": soso + "<b>Reply to the backup file</b>",
+        "invalid_backup": soso + "<b>This file is not a valid backup</b>",
+        "no_base": soso + "<b>Full backup, which this one is based on, is not found</b>",
+        "confirm_restore": soso + "<b>Are you sure, that you want to replace database with this backup?</b>",
+        "restore": "♻️ Restore",
+        "cancel": "🚫 Cancel",
+        "restored": soso + "<b>Database is restored. Restart to apply</b>",
     }
 
     strings_ru = {
@@ -31,8 +43,35 @@ class BackupMod(loader.Module):
         "saved": soso + "Периодичность сохранена! Ее можно изменить с помощью .set_backup_period",
         "never": soso + "Я не буду делать автоматические резервные копии. Можно отменить используя .set_backup_period",
         "invalid_args": soso + "<b>Укажи правильную периодичность в часах, или `0` для отключения</b>",
+        "incremental_doc": "Загружать только изменившуюся с последнего полного бэкапа часть базы",
+        "full_every_doc": "Делать полный бэкап после такого количества инкрементальных",
+        "reply_to_backup": soso + "<b>Ответь на файл бэкапа</b>",
+        "invalid_backup": soso + "<b>Этот файл не является бэкапом</b>",
+        "no_base": soso + "<b>Полный бэкап, на котором основан этот, не найден</b>",
+        "confirm_restore": soso + "<b>Ты уверен, что хочешь заменить базу данных этим бэкапом?</b>",
+        "restore": "♻️ Восстановить",
+        "cancel": "🚫 Отмена",
+        "restored": soso + "<b>База данных восстановлена. Перезагрузись для применения</b>",
+        "_cmd_doc_set_backup_period": "<время в часах> - Изменить периодичность бэкапов",
+        "_cmd_doc_restorebackup": "<ответ на файл> - Восстановить базу данных из бэкапа",
     }
 
+    def __init__(self):
+        self.config = loader.ModuleConfig(
+            loader.ConfigValue(
+                "incremental",
+                False,
+                lambda: self.strings("incremental_doc"),
+                validator=loader.validators.Boolean(),
+            ),
+            loader.ConfigValue(
+                "full_every",
+                24,
+                lambda: self.strings("full_every_doc"),
+                validator=loader.validators.Integer(minimum=1),
+            ),
+        )
+
     async def client_ready(self, client, db):
         self._db = db
         self._client = client
@@ -108,6 +147,155 @@ class BackupMod(loader.Module):
         self.set("last_backup", round(time.time()))
         await utils.answer(message, f"<b>{self.strings('saved')}</b>")
 
+    def _prepare(
+        self,
+        snapshot: dict,
+        last_hash: str,
+        base: Optional[dict],
+    ) -> tuple:
+        """
+        Encode, hash and compress backup. Runs in a worker thread
+        :param snapshot: Shallow copy of database
+        :param last_hash: Hash of the previous backup
+        :param base: Full backup to make delta against or `None` to make full one
+        :return: Tuple of (hash, per-owner hashes, compressed data or `None`,
+            if nothing changed, whether backup is a delta)
+        """
+        own = self.strings["name"]
+        segments = {
+            owner: codec.encode_segment(owner, value)
+            for owner, value in snapshot.items()
+        }
+        hashes = {
+            str(owner): hashlib.sha1(segment).hexdigest()
+            for owner, segment in segments.items()
+            if owner != own
+        }
+        digest = hashlib.sha256(
+            json.dumps(hashes, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+        if digest == last_hash:
+            return digest, hashes, None, False
+
+        if base:
+            changed = [
+                segment
+                for owner, segment in segments.items()
+                if owner == own or base["hashes"].get(str(owner)) != hashes[str(owner)]
+            ]
+            removed = [owner for owner in base["hashes"] if owner not in hashes]
+            data = b'{"base":%d,"removed":%s,"data":%s}' % (
+                base["id"],
+                codec.dumps(removed),
+                codec.join_segments(changed),
+            )
+        else:
+            data = codec.join_segments(list(segments.values()))
+
+        return digest, hashes, gzip.compress(data), bool(base)
+
+    async def _backup(self):
+        base = self.get("base")
+        incremental = (
+            self.config["incremental"]
+            and base
+            and base.get("deltas", 0) < self.config["full_every"]
+        )
+
+        digest, hashes, data, is_delta = await utils.run_sync(
+            self._prepare,
+            # Encoding is done in the thread, so only owners are copied here
+            dict(self._db),
+            self.get("last_hash"),
+            base if incremental else None,
+        )
+
+        if data is None:
+            logger.debug("Database is not changed since the last backup, skipping")
+            return
+
+        backup = io.BytesIO(data)
+        backup.name = (
+            f"hikka-db-{'delta' if is_delta else 'backup'}-"
+            f"{getattr(datetime, 'datetime', datetime).now().strftime('%d-%m-%Y-%H-%M')}"
+            ".json.gz"
+        )
+
+        message = await self._client.send_file(self._backup_channel, backup)
+
+        if is_delta:
+            base["deltas"] = base.get("deltas", 0) + 1
+            self.set("base", base)
+        else:
+            self.set("base", {"id": message.id, "hashes": hashes, "deltas": 0})
+
+        self.set("last_hash", digest)
+
+    async def _read_backup(self, message: Message) -> dict:
+        """Read backup from message, applying it to its base, if it's a delta"""
+        data = await message.download_media(bytes)
+        if data[:2] == b"\x1f\x8b":
+            data = await utils.run_sync(gzip.decompress, data)
+
+        data = codec.loads(data)
+        if "base" not in data or "data" not in data:
+            return data
+
+        base = await self._client.get_messages(self._backup_channel, ids=data["base"])
+        if not base or not base.file:
+            raise FileNotFoundError(f"Base backup {data['base']} not found")
+
+        result = await self._read_backup(base)
+        for owner in data["removed"]:
+            result.pop(owner, None)
+
+        result.update(data["data"])
+        return result
+
+    @loader.owner
+    async def restorebackupcmd(self, message: Message):
+        """<reply to file> - Restore database from backup"""
+        reply = await message.get_reply_message()
+        if not reply or not reply.file:
+            await utils.answer(message, self.strings("reply_to_backup"))
+            return
+
+        try:
+            data = await self._read_backup(reply)
+        except FileNotFoundError:
+            await utils.answer(message, self.strings("no_base"))
+            return
+        except Exception:
+            logger.debug("Can't read backup", exc_info=True)
+            data = None
+
+        if not isinstance(data, dict) or not self._db.process_db_autofix(data):
+            await utils.answer(message, self.strings("invalid_backup"))
+            return
+
+        await self.inline.form(
+            self.strings("confirm_restore"),
+            message,
+            reply_markup=[
+                {
+                    "text": self.strings("restore"),
+                    "callback": self._inline__restore,
+                    "args": (data,),
+                },
+                {
+                    "text": self.strings("cancel"),
+                    "action": "close",
+                },
+            ],
+        )
+
+    async def _inline__restore(self, call: InlineCall, data: dict):
+        self._db.clear()
+        self._db.update(**data)
+        self._db.save()
+        await utils.answer(call, self.strings("restored"))
+
     @loader.loop(interval=1)
     async def handler(self):
         try:
@@ -127,13 +315,7 @@ class BackupMod(loader.Module):
                 self.get("last_backup") + self.get("period") - time.time()
             )
 
-            backup = io.BytesIO(json.dumps(self._db).encode("utf-8"))
-            backup.name = f"hikka-db-backup-{getattr(datetime, 'datetime', datetime).now().strftime('%d-%m-%Y-%H-%M')}.json"
-
-            await self._client.send_file(
-                self._backup_channel,
-                backup,
-            )
+            await self._backup()
             self.set("last_backup", round(time.time()))
         except loader.StopLoop:
             raise
@@ -16,12 +16,11 @@ from collections import ChainMap
 from importlib.machinery import ModuleSpec
 from typing import Optional, Union
 from urllib.parse import urlparse
-import requests
 import telethon
 from telethon.tl.types import Message, Channel
 from telethon.tl.functions.channels import JoinChannelRequest
 from telethon.tl.functions.contacts import SearchRequest
-from .. import loader, main, utils
+from .. import http_cache, loader, main, utils
 from ..compat import geek
 from ..inline.types import InlineCall
 
@@ -92,6 +91,8 @@ class LoaderMod(loader.Module):
         "confirm_clearmodules": "⚠️ <b>Are you sure you want to clear all modules?</b>",
         "clearmodules": "🗑 Clear modules",
         "cancel": "🚫 Cancel",
+        "lazy_on": "💤 <b>Installed modules will be executed only on first use. Restart to apply</b>",
+        "lazy_off": "⚡️ <b>Installed modules will be executed on startup. Restart to apply</b>",
     }
 
     strings_ru = {
@@ -133,6 +134,9 @@ class LoaderMod(loader.Module):
         "_cmd_doc_loadmod": "Скачивает и устанавливает модуль из файла",
         "_cmd_doc_unloadmod": "Выгружает (удаляет) модуль",
         "_cmd_doc_clearmodules": "Выгружает все установленные модули",
+        "_cmd_doc_lazymodules": "Включить / выключить запуск установленных модулей только при первом использовании",
+        "lazy_on": "💤 <b>Установленные модули будут запускаться только при первом использовании. Перезагрузись для применения</b>",
+        "lazy_off": "⚡️ <b>Установленные модули будут запускаться при старте. Перезагрузись для применения</b>",
         "_cls_doc": "Загружает модули",
         "share_link_doc": "Указывать ссылку на модуль после загрузки через .dlmod",
         "modlink": "\n\n🌍 <b>Ссылка: </b><code>{}</code>",
@@ -258,13 +262,10 @@ class LoaderMod(loader.Module):
         if self._links_cache.get(preset_id, {}).get("exp", 0) >= time.time():
             return self._links_cache[preset_id]["data"]
 
-        res = await utils.run_sync(
-            requests.get,
-            f"{repo}/{preset}.txt",
-        )
+        res = await http_cache.fetcher.get(f"{repo}/{preset}.txt")
 
-        if not str(res.status_code).startswith("2"):
-            logger.debug(f"Can't load {repo=}, {preset=}, {res.status_code=}")
+        if not res.ok:
+            logger.debug(f"Can't load {repo=}, {preset=}, {res.status=}")
             return []
 
         self._links_cache[preset_id] = {
@@ -282,16 +283,25 @@ class LoaderMod(loader.Module):
         if preset is None or preset == "none":
             preset = "minimal"
 
-        return {
-            repo: {
-                f"Mod/{repo_id}/{i}": f'{repo.strip("/")}/{link}.py'
-                for i, link in enumerate(set(await self._get_repo(repo, preset)))
-            }
+        repos = [
+            (repo_id, repo)
             for repo_id, repo in enumerate(
                 [self.config["MODULES_REPO"]]
                 + ([] if only_primary else self.config["ADDITIONAL_REPOS"])
             )
             if repo.startswith("http")
+        ]
+
+        links = await asyncio.gather(
+            *[self._get_repo(repo, preset) for _, repo in repos]
+        )
+
+        return {
+            repo: {
+                f"Mod/{repo_id}/{i}": f'{repo.strip("/")}/{link}.py'
+                for i, link in enumerate(set(repo_links))
+            }
+            for (repo_id, repo), repo_links in zip(repos, links)
         }
 
     async def get_links_list(self):
@@ -341,9 +351,14 @@ class LoaderMod(loader.Module):
 
                     return False
 
-            r = await utils.run_sync(requests.get, url)
+            # Modules, installed on startup, are already prefetched
+            # by `_update_modules`, so they are not requested twice
+            r = await http_cache.fetcher.get(
+                url,
+                max_age=0 if self._fully_loaded else 5 * 60,
+            )
 
-            if r.status_code == 404:
+            if r.status == 404:
                 if message is not None:
                     await utils.answer(message, self.strings("no_module"))
 
@@ -898,6 +913,13 @@ class LoaderMod(loader.Module):
             ],
         )
 
+    @loader.owner
+    async def lazymodulescmd(self, message: Message):
+        """Toggle execution of installed modules only on their first use"""
+        state = not self._db.get(main.__name__, "lazy_modules", False)
+        self._db.set(main.__name__, "lazy_modules", state)
+        await utils.answer(message, self.strings("lazy_on" if state else "lazy_off"))
+
     async def _inline__clearmodules(self, call: InlineCall):
         self.set("loaded_modules", {})
 
@@ -926,6 +948,10 @@ class LoaderMod(loader.Module):
 
             install_join_forbidder(self._client)
 
+        # Modules are fetched concurrently, but installed one by one
+        # in the original order, because they may depend on each other
+        await http_cache.fetcher.get_many(todo.values())
+
         for mod in todo.values():
             await self.download_and_install(mod)
 
@@ -959,19 +985,3 @@ class LoaderMod(loader.Module):
 
         asyncio.ensure_future(self._update_modules())
         asyncio.ensure_future(self.get_repo_list("full"))
-
-    @loader.loop(interval=3, wait_before=True, autostart=True)
-    async def _modules_config_autosaver(self):
-        for mod in self.allmodules.modules:
-            if not hasattr(mod, "config") or not mod.config:
-                continue
-
-            for option, config in mod.config._config.items():
-                if not hasattr(config, "_save_marker"):
-                    continue
-
-                delattr(mod.config._config[option], "_save_marker")
-                self._db.setdefault(mod.__class__.__name__, {}).setdefault(
-                    "__config__", {}
-                )[option] = config.value
-                self._db.save()
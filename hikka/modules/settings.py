@@ -1,4 +1,6 @@
 import os
+import time
+from datetime import timedelta
 from telethon.tl.types import Message
 from .. import loader, main, translations, utils
 from ..inline.types import InlineCall
@@ -36,6 +38,11 @@ class CoreMod(loader.Module):
         "confirm_cleardb": "⚠️ <b>Are you sure, that you want to clear database?</b>",
         "cleardb_confirm": "🗑 Clear database",
         "cancel": "🚫 Cancel",
+        "revisions": "🗂 <b>Database revisions:</b>\n\n{}\n\n<i>Use</i> <code>{}dbrollback &lt;number&gt;</code> <i>to restore one of them</i>",
+        "revision": "<code>{}</code> {} ago: <i>{}</i>",
+        "no_revisions": "🚫 <b>There are no database revisions yet</b>",
+        "revision_invalid": "🚫 <b>Specify the number of revision from</b> <code>{}dbrevisions</code>",
+        "rolled_back": "✅ <b>Database is restored to the revision from {} ago. Restart to apply</b>",
     }
 
     strings_ru = {
@@ -79,6 +86,13 @@ class CoreMod(loader.Module):
         "confirm_cleardb": "⚠️ <b>Вы уверены, что хотите сбросить базу данных?</b>",
         "cleardb_confirm": "🗑 Очистить базу",
         "cancel": "🚫 Отмена",
+        "_cmd_doc_dbrevisions": "Показать сохраненные ревизии базы данных",
+        "_cmd_doc_dbrollback": "<номер> - Восстановить базу данных из ревизии",
+        "revisions": "🗂 <b>Ревизии базы данных:</b>\n\n{}\n\n<i>Используй</i> <code>{}dbrollback &lt;номер&gt;</code> <i>для восстановления</i>",
+        "revision": "<code>{}</code> {} назад: <i>{}</i>",
+        "no_revisions": "🚫 <b>Ревизий базы данных пока нет</b>",
+        "revision_invalid": "🚫 <b>Укажи номер ревизии из</b> <code>{}dbrevisions</code>",
+        "rolled_back": "✅ <b>База данных восстановлена из ревизии {} назад. Перезагрузись для применения</b>",
     }
 
     async def client_ready(self, client, db):
@@ -348,3 +362,55 @@ class CoreMod(loader.Module):
         self._db.clear()
         self._db.save()
         await utils.answer(call, self.strings("db_cleared"))
+
+    @staticmethod
+    def _revision_age(revision: "Revision") -> str:  # type: ignore
+        return str(timedelta(seconds=int(time.time() - revision.created)))
+
+    @loader.owner
+    async def dbrevisionscmd(self, message: Message):
+        """Show saved database revisions"""
+        revisions = self._db.revisions
+        if not revisions:
+            await utils.answer(message, self.strings("no_revisions"))
+            return
+
+        await utils.answer(
+            message,
+            self.strings("revisions").format(
+                "\n".join(
+                    self.strings("revision").format(
+                        i + 1,
+                        self._revision_age(revision),
+                        utils.escape_html(", ".join(map(str, revision.changed)))
+                        or "-",
+                    )
+                    for i, revision in enumerate(revisions)
+                ),
+                self.get_prefix(),
+            ),
+        )
+
+    @loader.owner
+    async def dbrollbackcmd(self, message: Message):
+        """<number> - Restore database from revision"""
+        args = utils.get_args_raw(message)
+        revisions = self._db.revisions
+
+        if (
+            not args.isdigit()
+            or not 1 <= int(args) <= len(revisions)
+            or not self._db.rollback(int(args) - 1)
+        ):
+            await utils.answer(
+                message,
+                self.strings("revision_invalid").format(self.get_prefix()),
+            )
+            return
+
+        await utils.answer(
+            message,
+            self.strings("rolled_back").format(
+                self._revision_age(revisions[int(args) - 1])
+            ),
+        )
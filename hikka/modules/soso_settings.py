@@ -11,6 +11,7 @@ from telethon.tl.functions.messages import (
 from telethon.utils import get_display_name
 from .. import loader, main, utils
 from ..inline.types import InlineCall
+from ..inline.webhook import WEBHOOK_MODES
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +55,19 @@ class HikkaSettingsMod(loader.Module):
         "no_download_btn": "🚫 Download via button",
         "suggest_subscribe": "✅ Suggest subscribe to channel",
         "do_not_suggest_subscribe": "🚫 Suggest subscribe to channel",
+        "direct_inline": "✅ Send inline units by bot",
+        "no_direct_inline": "🚫 Send inline units by bot",
         "private_not_allowed": "🚫 <b>This command must be executed in chat</b>",
+        "webhook_status": (
+            "🌐 <b>Inline bot updates mode:</b> <code>{}</code>\n"
+            "<b>Currently receives updates via:</b> <code>{}</code>"
+        ),
+        "webhook_mode_invalid": "🚫 <b>Mode must be one of:</b> <code>{}</code>",
+        "webhook_url_invalid": "🚫 <b>Invalid webhook url</b>",
+        "webhook_saved": (
+            "🌐 <b>Inline bot updates mode is set to</b> <code>{}</code><b>. Restart"
+            " userbot to apply it</b>"
+        ),
         "nonick_warning": (
             "Warning! You enabled NoNick with default prefix! "
             "You may get muted in Hikka chats. Change prefix or "
@@ -107,7 +120,22 @@ class HikkaSettingsMod(loader.Module):
         "no_download_btn": "🚫 Скачивать кнопкой",
         "suggest_subscribe": "✅ Предлагать подписку на канал",
         "do_not_suggest_subscribe": "🚫 Предлагать подписку на канал",
+        "direct_inline": "✅ Отправлять инлайн-формы ботом",
+        "no_direct_inline": "🚫 Отправлять инлайн-формы ботом",
         "private_not_allowed": "🚫 <b>Эту команду нужно выполнять в чате</b>",
+        "webhook_status": (
+            "🌐 <b>Режим получения обновлений инлайн ботом:</b> <code>{}</code>\n"
+            "<b>Сейчас обновления приходят через:</b> <code>{}</code>"
+        ),
+        "webhook_mode_invalid": "🚫 <b>Режим должен быть одним из:</b> <code>{}</code>",
+        "webhook_url_invalid": "🚫 <b>Неверная ссылка для вебхука</b>",
+        "webhook_saved": (
+            "🌐 <b>Режим получения обновлений инлайн ботом:</b> <code>{}</code><b>."
+            " Перезагрузи юзербот, чтобы применить его</b>"
+        ),
+        "_cmd_doc_inlinewebhook": (
+            "[off|on|local] [ссылка] - Настроить получение обновлений инлайн ботом"
+        ),
         "_cmd_doc_watchers": "Показать список смотрителей",
         "_cmd_doc_watcherbl": "<модуль> - Включить\\выключить смотритель в чате",
         "_cmd_doc_watcher": (
@@ -286,6 +314,39 @@ class HikkaSettingsMod(loader.Module):
 
         await utils.answer(message, self.strings("logs_cleared"))
 
+    @loader.owner
+    async def inlinewebhookcmd(self, message: Message):
+        """[off|on|local] [url] - Configure, how inline bot receives updates"""
+        args = utils.get_args(message)
+        if not args:
+            await utils.answer(
+                message,
+                self.strings("webhook_status").format(
+                    self._db.get("hikka.inline", "webhook", "off"),
+                    self.inline.update_transport or "-",
+                ),
+            )
+            return
+
+        if args[0] not in WEBHOOK_MODES:
+            await utils.answer(
+                message,
+                self.strings("webhook_mode_invalid").format(
+                    "|".join(WEBHOOK_MODES)
+                ),
+            )
+            return
+
+        if len(args) > 1:
+            if not utils.check_url(args[1]) or not args[1].startswith("https://"):
+                await utils.answer(message, self.strings("webhook_url_invalid"))
+                return
+
+            self._db.set("hikka.inline", "webhook_url", args[1])
+
+        self._db.set("hikka.inline", "webhook", args[0])
+        await utils.answer(message, self.strings("webhook_saved").format(args[0]))
+
     async def watcherscmd(self, message: Message):
         """List current watchers"""
         watchers, disabled_watchers = self.get_watchers()
@@ -764,6 +825,27 @@ class HikkaSettingsMod(loader.Module):
                     }
                 ),
             ],
+            [
+                (
+                    {
+                        "text": self.strings("direct_inline"),
+                        "callback": self.inline__setting,
+                        "args": (
+                            "direct_inline",
+                            False,
+                        ),
+                    }
+                    if self._db.get(main.__name__, "direct_inline", True)
+                    else {
+                        "text": self.strings("no_direct_inline"),
+                        "callback": self.inline__setting,
+                        "args": (
+                            "direct_inline",
+                            True,
+                        ),
+                    }
+                ),
+            ],
             [
                 {
                     "text": self.strings("btn_restart"),
@@ -0,0 +1,182 @@
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import io
+import json
+import time
+from datetime import timedelta
+from typing import Optional
+from telethon.tl.types import Message
+from .. import loader, main, utils
+
+
+@loader.tds
+class StatsMod(loader.Module):
+    """Shows latency and throughput statistics of modules' handlers"""
+
+    strings = {
+        "name": "Stats",
+        "no_stats": "📊 <b>No handler calls recorded yet</b>",
+        "header": "📊 <b>Top handlers by total time</b> <i>(since {} ago)</i>\n",
+        "line": (
+            "\n<code>{kind}</code> <b>{module}.{function}</b>\n"
+            "    <code>{calls}</code> calls, <code>{errors}</code> errors,"
+            " <code>{rps:.2f}</code>/min\n"
+            "    mean <code>{mean:.1f}</code> ms, p95 ≤ <code>{p95:.0f}</code> ms,"
+            " max <code>{max:.1f}</code> ms"
+        ),
+        "lag": (
+            "\n\n🐢 <b>Event loop</b>: max lag <code>{max_lag:.0f}</code> ms,"
+            " <code>{stalls}</code> stalls"
+        ),
+        "stall": (
+            "\n    <code>{time}</code> <b>{owner}</b> <code>{duration:.0f}</code> ms"
+        ),
+        "dump_caption": "📊 <b>Handler stats dump</b>",
+        "reset": "📊 <b>Handler stats reset</b>",
+    }
+
+    strings_ru = {
+        "no_stats": "📊 <b>Пока не было ни одного вызова обработчиков</b>",
+        "header": "📊 <b>Самые затратные обработчики</b> <i>(за последние {})</i>\n",
+        "line": (
+            "\n<code>{kind}</code> <b>{module}.{function}</b>\n"
+            "    <code>{calls}</code> вызовов, <code>{errors}</code> ошибок,"
+            " <code>{rps:.2f}</code>/мин\n"
+            "    в среднем <code>{mean:.1f}</code> мс, p95 ≤ <code>{p95:.0f}</code> мс,"
+            " макс. <code>{max:.1f}</code> мс"
+        ),
+        "lag": (
+            "\n\n🐢 <b>Цикл событий</b>: макс. задержка <code>{max_lag:.0f}</code> мс,"
+            " <code>{stalls}</code> блокировок"
+        ),
+        "stall": (
+            "\n    <code>{time}</code> <b>{owner}</b> <code>{duration:.0f}</code> мс"
+        ),
+        "dump_caption": "📊 <b>Статистика обработчиков</b>",
+        "reset": "📊 <b>Статистика обработчиков сброшена</b>",
+        "_cmd_doc_stats": "[модуль] [kind] - Показать статистику обработчиков",
+        "_cmd_doc_statsdump": "Выгрузить статистику обработчиков в JSON",
+        "_cmd_doc_statsreset": "Сбросить статистику обработчиков",
+        "_cls_doc": "Показывает задержки и нагрузку обработчиков модулей",
+    }
+
+    def __init__(self):
+        self.config = loader.ModuleConfig(
+            loader.ConfigValue(
+                "top",
+                10,
+                lambda: "How many handlers to show in .stats",
+                validator=loader.validators.Integer(minimum=1, maximum=50),
+            ),
+        )
+
+    async def client_ready(self, client, db):
+        self._client = client
+
+    def _lag_monitor(self):
+        # Monitor is started only if `--lag-threshold` is positive
+        return getattr(main.hikka, "lag_monitor", None)
+
+    def _format_lag(self, module: Optional[str] = None) -> str:
+        monitor = self._lag_monitor()
+        if monitor is None:
+            return ""
+
+        stalls = monitor.summary(module)
+        return self.strings("lag").format(
+            max_lag=monitor.max_lag * 1000,
+            stalls=len(stalls),
+        ) + "".join(
+            self.strings("stall").format(
+                time=time.strftime("%H:%M:%S", time.localtime(stall.time)),
+                owner=utils.escape_html(stall.owner),
+                duration=stall.duration * 1000,
+            )
+            for stall in stalls[-5:]
+        )
+
+    async def statscmd(self, message: Message):
+        """[module] [kind] - Show statistics of handlers"""
+        args = utils.get_args(message)
+        kinds = {"command", "watcher", "inline", "callback", "loop", "update"}
+        kind = next((arg for arg in args if arg.lower() in kinds), None)
+        module = next((arg for arg in args if arg.lower() not in kinds), None)
+
+        registry = self.allmodules.stats
+        items = sorted(
+            registry.items(kind.lower() if kind else None, module),
+            key=lambda item: item[1].total,
+            reverse=True,
+        )[: self.config["top"]]
+
+        if not items:
+            await utils.answer(
+                message,
+                self.strings("no_stats") + self._format_lag(module),
+            )
+            return
+
+        elapsed = max(time.time() - registry.since, 1)
+
+        await utils.answer(
+            message,
+            self.strings("header").format(timedelta(seconds=round(elapsed)))
+            + "".join(
+                self.strings("line").format(
+                    kind=kind_,
+                    module=utils.escape_html(module_),
+                    function=utils.escape_html(function),
+                    calls=stats.calls,
+                    errors=stats.errors,
+                    rps=stats.calls / elapsed * 60,
+                    mean=stats.mean,
+                    p95=stats.percentile(95),
+                    max=stats.max,
+                )
+                for (kind_, module_, function), stats in items
+            )
+            + self._format_lag(module),
+        )
+
+    async def statsdumpcmd(self, message: Message):
+        """Dump statistics of handlers in JSON"""
+        data = self.allmodules.stats.dump()
+        if (monitor := self._lag_monitor()) is not None:
+            data["lag"] = {
+                "max_lag": monitor.max_lag,
+                "stalls": [
+                    {
+                        "time": stall.time,
+                        "duration": stall.duration,
+                        "owner": stall.owner,
+                        "client_id": stall.client_id,
+                    }
+                    for stall in monitor.summary()
+                ],
+            }
+
+        dump = io.BytesIO(json.dumps(data, indent=4).encode("utf-8"))
+        dump.name = "hikka-stats.json"
+
+        await self._client.send_file(
+            utils.get_chat_id(message),
+            dump,
+            caption=self.strings("dump_caption"),
+            reply_to=getattr(message, "reply_to_msg_id", None),
+        )
+
+        if message.out:
+            await message.delete()
+
+    async def statsresetcmd(self, message: Message):
+        """Reset statistics of handlers"""
+        self.allmodules.stats.reset()
+        await utils.answer(message, self.strings("reset"))
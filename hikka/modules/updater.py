@@ -150,11 +150,31 @@ class UpdaterMod(loader.Module):
         await self.restart_common(call)
 
     async def process_restart_message(self, msg_obj: Union[InlineCall, Message]):
+        if not hasattr(msg_obj, "inline_message_id"):
+            self.set("selfupdatemsg", f"{utils.get_chat_id(msg_obj)}:{msg_obj.id}")
+            return
+
+        target = self.inline._edit_target(
+            self.inline._units.get(getattr(msg_obj, "unit_id", None), {}),
+            msg_obj,
+            msg_obj.inline_message_id,
+        )
+
         self.set(
             "selfupdatemsg",
-            msg_obj.inline_message_id
-            if hasattr(msg_obj, "inline_message_id")
-            else f"{utils.get_chat_id(msg_obj)}:{msg_obj.id}",
+            target.get("inline_message_id")
+            or (
+                f"bot:{target['chat_id']}:{target['message_id']}" if target else None
+            ),
+        )
+
+    async def _edit_bot_message(self, ms: str, text: str):
+        """Edit message, sent by inline bot itself (`bot:<chat_id>:<message_id>`)"""
+        _, chat_id, message_id = ms.split(":")
+        await self.inline.bot.edit_message_text(
+            text,
+            chat_id=int(chat_id),
+            message_id=int(message_id),
         )
 
     async def restart_common(self, msg_obj: Union[InlineCall, Message]):
@@ -462,6 +482,10 @@ class UpdaterMod(loader.Module):
         msg = self.strings("success").format(utils.ascii_face(), took)
         ms = self.get("selfupdatemsg")
 
+        if str(ms).startswith("bot:"):
+            await self._edit_bot_message(ms, msg)
+            return
+
         if ":" in str(ms):
             chat_id, message_id = ms.split(":")
             chat_id, message_id = int(chat_id), int(message_id)
@@ -491,6 +515,10 @@ class UpdaterMod(loader.Module):
 
         self.set("selfupdatemsg", None)
 
+        if str(ms).startswith("bot:"):
+            await self._edit_bot_message(ms, msg)
+            return
+
         if ":" in str(ms):
             chat_id, message_id = ms.split(":")
             chat_id, message_id = int(chat_id), int(message_id)
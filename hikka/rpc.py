@@ -0,0 +1,402 @@
+"""Ordered middleware chain for MTProto requests of client"""
+
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import asyncio
+import contextlib
+import contextvars
+import copy
+import functools
+import logging
+import sys
+import time
+from typing import Optional
+
+from telethon import TelegramClient, events
+from telethon import utils as tl_utils
+from telethon.tl import functions, types
+from telethon.utils import is_list_like
+
+from ._types import Module
+
+logger = logging.getLogger(__name__)
+
+# Handler (command, watcher, loop, inline handler etc.), which is
+# currently being executed. Set by dispatcher, loops and inline manager
+current_handler = contextvars.ContextVar("current_handler", default=None)
+
+# Read-only requests, which are safe to merge, if they are sent concurrently,
+# and default time in seconds to cache their results. 0 means, that requests
+# are only merged, while in flight. Can be overriden via `set_cache_ttls`
+DEFAULT_CACHE_TTLS = {
+    "messages.GetFullChatRequest": 30,
+    "channels.GetFullChannelRequest": 30,
+    "users.GetUsersRequest": 10,
+    "users.GetFullUserRequest": 30,
+    "messages.GetDialogFiltersRequest": 60,
+    # Messages can be edited at any moment, so they are not cached by default
+    "messages.GetMessagesRequest": 0,
+    "channels.GetMessagesRequest": 0,
+}
+
+# Maximum amount of cached responses per client
+CACHE_SIZE = 512
+
+# Updates, which mean that cached chats, users or rights of participants
+# are outdated. Results of these requests are used by security checks
+INVALIDATING_UPDATES = (
+    types.UpdateChatParticipants,
+    types.UpdateChatParticipantAdd,
+    types.UpdateChatParticipantDelete,
+    types.UpdateChatParticipantAdmin,
+    types.UpdateChatDefaultBannedRights,
+    types.UpdateChannelParticipant,
+    types.UpdateChannel,
+    types.UpdateChat,
+    types.UpdateUserName,
+)
+
+
+def _constructor_id(name: str) -> Optional[int]:
+    namespace, _, name = name.rpartition(".")
+    request = getattr(getattr(functions, namespace, None), name, None)
+    return getattr(request, "CONSTRUCTOR_ID", None)
+
+
+@contextlib.contextmanager
+def handler_context(handler: callable):
+    """
+    Mark code inside the context as executed by `handler`
+    :param handler: Bound method of module
+    """
+    token = current_handler.set(handler)
+    try:
+        yield
+    finally:
+        current_handler.reset(token)
+
+
+def get_caller(ignore: Optional[set] = None) -> Optional[Module]:
+    """
+    Get the module, which is responsible for current code execution
+    :param ignore: Class names of modules to skip, while walking the stack
+    :return: Module instance or `None`, if it can't be determined
+    """
+    handler = current_handler.get()
+    while isinstance(handler, functools.partial):
+        handler = handler.func
+
+    instance = getattr(handler, "__self__", None)
+    if isinstance(instance, Module) and (
+        not ignore or instance.__class__.__name__ not in ignore
+    ):
+        return instance
+
+    # Code is not running inside of a handler (e.g. `client_ready`'s
+    # background tasks), so fall back to walking the stack
+    frame = sys._getframe(1)  # skipcq
+    while frame is not None:
+        if "self" in frame.f_code.co_varnames:
+            instance = frame.f_locals.get("self")
+            if isinstance(instance, Module) and (
+                not ignore or instance.__class__.__name__ not in ignore
+            ):
+                return instance
+
+        frame = frame.f_back
+
+    return None
+
+
+class Middleware:
+    """
+    Request interceptor
+    `pre` is awaited before sending request as `pre(client, request)` and
+    must return request to send (the same one or modified) or `None` to drop it.
+    `post` is awaited after receiving the result as `post(client, request, result)`
+    and must return the result to pass to the caller
+    """
+
+    __slots__ = ("name", "pre", "post", "constructors", "priority")
+
+    def __init__(
+        self,
+        name: str,
+        pre: Optional[callable] = None,
+        post: Optional[callable] = None,
+        constructors: Optional[set] = None,
+        priority: int = 0,
+    ):
+        """
+        :param name: Unique name of middleware
+        :param pre: Hook to run before request
+        :param post: Hook to run after request
+        :param constructors: Constructor ids of requests to intercept. All requests, if `None`
+        :param priority: Middlewares with lower priority run first
+        """
+        self.name = name
+        self.pre = pre
+        self.post = post
+        self.constructors = set(constructors) if constructors is not None else None
+        self.priority = priority
+
+    def __repr__(self):
+        return f"<Middleware {self.name}>"
+
+
+class RequestChain:
+    """
+    Replaces `client._call` with the single entry point, which runs
+    middlewares, matching the constructor id of request
+    """
+
+    def __init__(self, client: TelegramClient):
+        self._client = client
+        self._middlewares = []
+        self._routes = {}
+        self._ttls = {}
+        self._inflight = {}
+        self._cache = {}
+        self.set_cache_ttls({})
+        self._old_call = client._call
+        client._call = self._call
+        client.add_event_handler(
+            self._on_update,
+            events.Raw(types=INVALIDATING_UPDATES),
+        )
+
+    @property
+    def middlewares(self) -> list:
+        return list(self._middlewares)
+
+    def add(self, middleware: Middleware) -> Middleware:
+        """Add middleware to chain, replacing the one with the same name"""
+        self.remove(middleware.name)
+        self._middlewares += [middleware]
+        self._middlewares.sort(key=lambda middleware: middleware.priority)
+        self._routes = {}
+        logger.debug(f"Added {middleware} to request chain")
+        return middleware
+
+    def remove(self, name: str) -> bool:
+        """Remove middleware by name"""
+        if name not in self:
+            return False
+
+        self._middlewares = [
+            middleware for middleware in self._middlewares if middleware.name != name
+        ]
+        self._routes = {}
+        logger.debug(f"Removed middleware {name} from request chain")
+        return True
+
+    def set_cache_ttls(self, overrides: dict):
+        """
+        Configure merging and caching of read-only requests
+        :param overrides: Mapping of request name (e.g. `messages.GetFullChatRequest`)
+            to cache TTL in seconds. Negative TTL disables merging of request
+        """
+        ttls = {}
+        for name, ttl in {**DEFAULT_CACHE_TTLS, **overrides}.items():
+            constructor_id = _constructor_id(name)
+            if constructor_id is None:
+                logger.warning(f"Unknown request {name} in cache TTLs")
+                continue
+
+            if isinstance(ttl, bool) or not isinstance(ttl, (int, float)):
+                logger.warning(f"Invalid cache TTL {ttl!r} of {name}")
+                continue
+
+            if ttl >= 0:
+                ttls[constructor_id] = ttl
+
+        self._ttls = ttls
+        self._cache = {}
+
+    def invalidate_cache(self):
+        self._cache = {}
+
+    async def _on_update(self, update: "TLObject"):  # type: ignore
+        # Cache is small and such updates are rare, so
+        # it's not worth finding out, which results are affected
+        self.invalidate_cache()
+
+    async def _coalesce(
+        self,
+        sender: "MTProtoSender",  # type: ignore
+        request: "TLRequest",  # type: ignore
+        ordered: bool,
+        flood_sleep_threshold: int,
+    ):
+        """Send request, merging it with identical in-flight one or using cached result"""
+        # Entities must be resolved to compare requests by their bytes
+        await request.resolve(self._client, tl_utils)
+        # Requests, sent to other DCs (e.g. by fast uploader), are not merged
+        # with the ones of main sender
+        key = (id(sender), bytes(request))
+
+        if key in self._cache:
+            expires, result = self._cache[key]
+            if expires > time.monotonic():
+                # Each caller gets its own copy, so it can safely modify it
+                return copy.deepcopy(result)
+
+            del self._cache[key]
+
+        if key in self._inflight:
+            # The first caller gets the result itself, so merged
+            # ones get their own copies
+            waiter = asyncio.get_event_loop().create_future()
+            self._inflight[key][1].append(waiter)
+            return await waiter
+
+        # Request is sent in separate task so cancellation of the
+        # first caller doesn't affect other ones
+        task = asyncio.ensure_future(
+            self._old_call(sender, request, ordered, flood_sleep_threshold)
+        )
+        task.add_done_callback(
+            functools.partial(
+                self._on_done,
+                key,
+                self._ttls[request.CONSTRUCTOR_ID],
+            )
+        )
+        self._inflight[key] = (task, [])
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: tuple, ttl: int, task: asyncio.Task):
+        # Called before the first caller is resumed, so the result
+        # is copied before it can be modified
+        _, waiters = self._inflight.pop(key)
+        for waiter in waiters:
+            if waiter.done():
+                continue
+
+            if task.cancelled():
+                waiter.cancel()
+            elif task.exception() is not None:
+                waiter.set_exception(task.exception())
+            else:
+                waiter.set_result(copy.deepcopy(task.result()))
+
+        if task.cancelled() or task.exception() is not None or not ttl:
+            return
+
+        if len(self._cache) >= CACHE_SIZE:
+            now = time.monotonic()
+            self._cache = {
+                key: record for key, record in self._cache.items() if record[0] > now
+            }
+            if len(self._cache) >= CACHE_SIZE:
+                del self._cache[next(iter(self._cache))]
+
+        self._cache[key] = (time.monotonic() + ttl, copy.deepcopy(task.result()))
+
+    def __contains__(self, name: str) -> bool:
+        return any(middleware.name == name for middleware in self._middlewares)
+
+    def _route(self, constructor_id: int) -> tuple:
+        """Get `pre` and `post` hooks for request type. Result is cached"""
+        if constructor_id not in self._routes:
+            matching = [
+                middleware
+                for middleware in self._middlewares
+                if middleware.constructors is None
+                or constructor_id in middleware.constructors
+            ]
+            self._routes[constructor_id] = (
+                tuple(middleware.pre for middleware in matching if middleware.pre),
+                tuple(middleware.post for middleware in matching if middleware.post),
+            )
+
+        return self._routes[constructor_id]
+
+    async def _pre(self, request: "TLRequest") -> "TLRequest":  # type: ignore
+        for hook in self._route(request.CONSTRUCTOR_ID)[0]:
+            request = await hook(self._client, request)
+            if request is None:
+                break
+
+        return request
+
+    async def _post(self, request: "TLRequest", result: "TLObject"):  # type: ignore
+        for hook in self._route(request.CONSTRUCTOR_ID)[1]:
+            result = await hook(self._client, request, result)
+
+        return result
+
+    async def _call(
+        self,
+        sender: "MTProtoSender",  # type: ignore
+        request: "TLRequest",  # type: ignore
+        ordered: bool = False,
+        flood_sleep_threshold: int = None,
+    ):
+        if not is_list_like(request):
+            if self._middlewares:
+                request = await self._pre(request)
+                if request is None:
+                    return None
+
+            if request.CONSTRUCTOR_ID in self._ttls:
+                result = await self._coalesce(
+                    sender,
+                    request,
+                    ordered,
+                    flood_sleep_threshold,
+                )
+            else:
+                result = await self._old_call(
+                    sender,
+                    request,
+                    ordered,
+                    flood_sleep_threshold,
+                )
+
+            return await self._post(request, result) if self._middlewares else result
+
+        if not self._middlewares:
+            return await self._old_call(
+                sender,
+                request,
+                ordered,
+                flood_sleep_threshold,
+            )
+
+        requests = []
+        for item in request:
+            item = await self._pre(item)
+            if item is not None:
+                requests += [item]
+
+        if not requests:
+            return None
+
+        results = await self._old_call(
+            sender,
+            tuple(requests),
+            ordered,
+            flood_sleep_threshold,
+        )
+
+        return [
+            await self._post(item, result) for item, result in zip(requests, results)
+        ]
+
+
+def get_chain(client: TelegramClient) -> RequestChain:
+    """Get request chain of client, installing it, if needed"""
+    if not isinstance(getattr(client, "request_chain", None), RequestChain):
+        client.request_chain = RequestChain(client)
+
+    return client.request_chain
+
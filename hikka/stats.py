@@ -0,0 +1,171 @@
+"""Collects latency and throughput statistics of modules' handlers"""
+
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import bisect
+import contextlib
+import functools
+import time
+from typing import Optional, Tuple
+
+# Upper bounds of latency buckets in milliseconds. Everything, that took
+# longer than the last bound falls into the overflow bucket
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def get_owner(func: callable) -> Tuple[str, str]:
+    """
+    Get the name of module and function, which owns `func`
+    :param func: Bound method, function or `functools.partial`
+    :return: Tuple of module name and function name
+    """
+    while isinstance(func, functools.partial):
+        func = func.func
+
+    instance = getattr(func, "__self__", None)
+    func = getattr(func, "__func__", func)
+
+    return (
+        instance.__class__.__name__
+        if instance is not None
+        else getattr(func, "__module__", None) or "<unknown>"
+    ), getattr(func, "__name__", None) or repr(func)
+
+
+class HandlerStats:
+    """Counters and latency histogram of single handler"""
+
+    __slots__ = ("calls", "errors", "total", "max", "histogram")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+
+    def record(self, duration: float, error: bool = False):
+        """
+        Record single call
+        :param duration: Call duration in milliseconds
+        :param error: Whether the call raised an exception
+        """
+        self.calls += 1
+        self.errors += error
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.histogram[bisect.bisect_left(BUCKETS, duration)] += 1
+
+    def percentile(self, percent: float) -> float:
+        """
+        Get approximate percentile of latency
+        :param percent: Percentile to get (0-100)
+        :return: Upper bound of the bucket, containing percentile, in milliseconds
+        """
+        if not self.calls:
+            return 0.0
+
+        threshold = self.calls * percent / 100
+        seen = 0
+        for index, count in enumerate(self.histogram):
+            seen += count
+            if seen >= threshold:
+                return float(BUCKETS[index]) if index < len(BUCKETS) else self.max
+
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.mean, 3),
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "histogram": dict(
+                zip(
+                    [str(bound) for bound in BUCKETS] + ["inf"],
+                    self.histogram,
+                )
+            ),
+        }
+
+
+class StatsRegistry:
+    """Stores `HandlerStats` of each handler, keyed by kind, module and function"""
+
+    def __init__(self):
+        self._stats = {}
+        self.since = time.time()
+
+    def get(self, kind: str, module: str, function: str) -> HandlerStats:
+        key = (kind, module, function)
+        if key not in self._stats:
+            self._stats[key] = HandlerStats()
+
+        return self._stats[key]
+
+    @contextlib.contextmanager
+    def measure(
+        self,
+        kind: str,
+        func: callable,
+        owner: Optional[tuple] = None,
+        ignore: tuple = (),
+    ):
+        """
+        Measure the execution time of code inside the context
+        :param kind: Kind of handler (`command`, `watcher`, `inline`, `callback`, `loop`, `update`)
+        :param func: Handler, which is being executed
+        :param owner: Tuple of module and function names, if it can't be parsed from `func`
+        :param ignore: Exception types, which must not be counted as errors
+        """
+        stats = self.get(kind, *(owner or get_owner(func)))
+        start = time.perf_counter()
+        try:
+            yield stats
+        except BaseException as e:
+            stats.record(
+                (time.perf_counter() - start) * 1000,
+                not isinstance(e, ignore),
+            )
+            raise
+        else:
+            stats.record((time.perf_counter() - start) * 1000)
+
+    def items(self, kind: Optional[str] = None, module: Optional[str] = None):
+        """Iterate over `((kind, module, function), HandlerStats)` pairs"""
+        return [
+            (key, stats)
+            for key, stats in self._stats.items()
+            if (kind is None or key[0] == kind)
+            and (module is None or key[1].lower() == module.lower())
+        ]
+
+    def reset(self):
+        self._stats.clear()
+        self.since = time.time()
+
+    def dump(self) -> dict:
+        """Machine-readable representation of all collected stats"""
+        result = {"since": round(self.since), "buckets_ms": list(BUCKETS)}
+        for (kind, module, function), stats in self._stats.items():
+            result.setdefault(kind, {}).setdefault(module, {})[
+                function
+            ] = stats.to_dict()
+
+        return result
@@ -0,0 +1,199 @@
+"""Runs each group of accounts in a separate worker process"""
+
+# █ █ ▀ █▄▀ ▄▀█ █▀█ ▀    ▄▀█ ▀█▀ ▄▀█ █▀▄▀█ ▄▀█
+# █▀█ █ █ █ █▀█ █▀▄ █ ▄  █▀█  █  █▀█ █ ▀ █ █▀█
+#
+#              © Copyright 2022
+#
+#          https://t.me/hikariatama
+#
+# 🔒 Licensed under the GNU GPLv3
+# 🌐 https://www.gnu.org/licenses/agpl-3.0.html
+
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import sys
+import time
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Arguments, which are handled by supervisor and must not be passed to workers
+# (name: whether it takes value)
+SUPERVISOR_ARGS = {"--supervisor": False, "--sessions-per-worker": True}
+
+# Worker, which crashed faster than this amount of seconds after start,
+# is restarted with increasing delay
+STABLE_UPTIME = 60
+MAX_BACKOFF = 60
+
+# Output of workers is read by chunks of this size, so long lines
+# (e.g. tracebacks or dumps) don't exceed the limit of stream reader
+PIPE_CHUNK = 64 * 1024
+
+
+class Worker:
+    """Single worker process, serving a group of sessions"""
+
+    def __init__(self, index: int, sessions: List[str], args: List[str]):
+        self.index = index
+        self.sessions = sessions
+        self.args = args
+        self.process = None
+        self.started = 0
+        self.backoff = 1
+        self.restarts = 0
+
+    @property
+    def name(self) -> str:
+        return f"worker-{self.index}"
+
+    async def start(self):
+        env = os.environ.copy()
+        if self.index:
+            # String session from environment is served by the first worker only
+            env.pop("hikka_session", None)
+
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "hikka",
+            *self.args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=env,
+        )
+        self.started = time.monotonic()
+        logger.info(f"Started {self.name} (pid {self.process.pid}) for {self.sessions}")
+
+    def _write(self, line: bytes):
+        sys.stdout.write(f"[{self.name}] {line.decode('utf-8', 'replace')}\n")
+        sys.stdout.flush()
+
+    async def pipe_output(self):
+        """Forward output of worker to supervisor's stdout, prefixed with its name"""
+        buffer = b""
+        while chunk := await self.process.stdout.read(PIPE_CHUNK):
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            for line in lines:
+                self._write(line)
+
+            if len(buffer) > PIPE_CHUNK:
+                # Line is too long, so it's forwarded in parts
+                self._write(buffer)
+                buffer = b""
+
+        if buffer:
+            self._write(buffer)
+
+
+class Supervisor:
+    """
+    Spawns worker processes, aggregates their output and
+    restarts crashed ones independently
+    """
+
+    def __init__(self, arguments, sessions: List[str], argv: List[str]):
+        """
+        :param arguments: Parsed arguments of supervisor
+        :param sessions: Names of session files (without `.session`)
+        :param argv: Raw command line arguments to forward to workers
+        """
+        self._arguments = arguments
+        self._stopping = False
+        self._workers = []
+
+        per_worker = max(arguments.sessions_per_worker, 1)
+        forwarded = self._strip_args(argv)
+
+        groups = [
+            sessions[i : i + per_worker] for i in range(0, len(sessions), per_worker)
+        ]
+
+        for index, group in enumerate(groups):
+            args = forwarded + [
+                arg for session in group for arg in ("--session", session)
+            ]
+
+            # Web interface is not shared between processes yet: only the first
+            # worker serves it on the configured port, so accounts of other
+            # workers can't be managed from it and their inline bots can't
+            # receive updates via webhook (they fall back to polling)
+            if index:
+                args += ["--no-web"]
+
+            self._workers += [Worker(index, group, args)]
+
+    @staticmethod
+    def _strip_args(argv: List[str]) -> List[str]:
+        result = []
+        skip = False
+        for arg in argv:
+            if skip:
+                skip = False
+                continue
+
+            name = arg.split("=", maxsplit=1)[0]
+            if name in SUPERVISOR_ARGS:
+                skip = SUPERVISOR_ARGS[name] and "=" not in arg
+                continue
+
+            result += [arg]
+
+        return result
+
+    async def _run_worker(self, worker: Worker):
+        while not self._stopping:
+            await worker.start()
+            try:
+                await worker.pipe_output()
+            except Exception:
+                # Worker must be awaited anyway, so it's not left orphaned
+                logger.exception(f"Can't forward output of {worker.name}")
+
+            code = await worker.process.wait()
+
+            if self._stopping:
+                break
+
+            if time.monotonic() - worker.started > STABLE_UPTIME:
+                worker.backoff = 1
+
+            worker.restarts += 1
+            logger.warning(
+                f"{worker.name} exited with code {code}, restarting in"
+                f" {worker.backoff}s"
+            )
+            await asyncio.sleep(worker.backoff)
+            worker.backoff = min(worker.backoff * 2, MAX_BACKOFF)
+
+    def stop(self):
+        self._stopping = True
+        for worker in self._workers:
+            if worker.process and worker.process.returncode is None:
+                with contextlib.suppress(ProcessLookupError):
+                    worker.process.terminate()
+
+    def run(self, loop: asyncio.AbstractEventLoop):
+        """Run all workers until supervisor is stopped"""
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):
+                loop.add_signal_handler(sig, self.stop)
+
+        logger.info(
+            f"Supervisor started {len(self._workers)} worker(s) for"
+            f" {sum(len(worker.sessions) for worker in self._workers)} session(s)"
+        )
+
+        if len(self._workers) > 1:
+            logger.warning(
+                "Web interface and inline bot webhooks are available only for"
+                f" sessions of the first worker: {', '.join(self._workers[0].sessions)}"
+            )
+
+        loop.run_until_complete(
+            asyncio.gather(*[self._run_worker(worker) for worker in self._workers])
+        )
@@ -12,9 +12,7 @@ import json
 import logging
 import os
 
-import requests
-
-from . import utils
+from . import http_cache, utils
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +21,22 @@ class Translator:
     def __init__(self, client, db):
         self._client = client
         self.db = db
+        self._data = {}
+        self.lang = db.get(__name__, "lang", "en")
+        # Incremented each time pack or language changes,
+        # so `Strings` know, when to drop resolved strings
+        self.generation = 0
 
     async def init(self) -> bool:
         self._data = {}
+        self.lang = self.db.get(__name__, "lang", "en")
+        self.generation += 1
+        try:
+            return await self._load()
+        finally:
+            self.generation += 1
+
+    async def _load(self) -> bool:
         if not (pack := self.db.get(__name__, "pack", False)):
             return False
 
@@ -49,7 +60,9 @@ class Translator:
             return False
 
         try:
-            ndata = (await utils.run_sync(requests.get, pack)).json()
+            res = await http_cache.fetcher.get(pack)
+            res.raise_for_status()
+            ndata = json.loads(res.content)
         except Exception:
             logger.exception(f"Unable to decode {pack}")
             return False
@@ -79,8 +92,10 @@ class Strings:
             logger.debug(f"Module {mod=} got empty translator {translator=}")
 
         self._base_strings = mod.strings  # Back 'em up, bc they will get replaced
+        self._generation = None
+        self._resolved = {}
 
-    def __getitem__(self, key: str) -> str:
+    def _resolve(self, key: str) -> str:
         return (
             self._translator.getkey(f"{self._mod.__module__}.{key}")
             if self._translator is not None
@@ -88,7 +103,7 @@ class Strings:
         ) or (
             getattr(
                 self._mod,
-                f"strings_{self._translator.db.get(__name__, 'lang', 'en')}",
+                f"strings_{self._translator.lang}",
                 self._base_strings,
             )
             if self._translator is not None
@@ -98,6 +113,20 @@ class Strings:
             self._base_strings.get(key, "Unknown strings"),
         )
 
+    def __getitem__(self, key: str) -> str:
+        # Strings are resolved once per language / pack and
+        # then served from the flat dict
+        generation = getattr(self._translator, "generation", 0)
+        if generation != self._generation:
+            self._generation = generation
+            self._resolved = {}
+
+        try:
+            return self._resolved[key]
+        except KeyError:
+            value = self._resolved[key] = self._resolve(key)
+            return value
+
     def __call__(
         self,
         key: str,
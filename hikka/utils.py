@@ -1,9 +1,11 @@
 """Utilities"""
 
 import asyncio
+import bisect
 import contextlib
 import functools
 import io
+import itertools
 import json
 import logging
 import os
@@ -14,13 +16,14 @@ import string
 import time
 import inspect
 from datetime import timedelta
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, AsyncIterable, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import git
 import grapheme
 import requests
 import telethon
+from telethon.errors.rpcerrorlist import MessageNotModifiedError
 from telethon.hints import Entity
 from telethon.tl.custom.message import Message
 from telethon.tl.functions.account import UpdateNotifySettingsRequest
@@ -60,6 +63,7 @@ from telethon.tl.types import (
     UpdateNewChannelMessage,
 )
 
+from . import edit_scheduler
 from .inline.types import InlineCall, InlineMessage
 
 FormattingEntity = Union[
@@ -260,14 +264,29 @@ async def answer(
     response: str,
     *,
     reply_markup: Optional[Union[List[List[dict]], List[dict], dict]] = None,
+    coalesce: bool = False,
     **kwargs,
 ) -> Union[InlineCall, InlineMessage, Message]:
-    """Use this to give the response to a command"""
+    """
+    Use this to give the response to a command
+    :param response: Text, media or async iterable of text chunks. Chunks are sent as
+                     soon as they are produced: the message is edited, while text fits
+                     in it, and the next messages are sent, when it overflows
+    :param coalesce: Don't wait for the edit, but schedule it instead. If the message is
+                     edited again before the edit is sent, only the latest one will be sent.
+                     Use it for progress bars and other frequent updates
+    """
     # Compatibility with FTG\GeekTG
 
     if isinstance(message, list) and message:
         message = message[0]
 
+    if hasattr(response, "__aiter__") and isinstance(
+        message, (InlineMessage, InlineCall)
+    ):
+        # Inline message can't be continued by the new ones
+        response = "".join([chunk async for chunk in response])
+
     if reply_markup is not None:
         if not isinstance(reply_markup, (list, dict)):
             raise ValueError("reply_markup must be a list or dict")
@@ -287,6 +306,11 @@ async def answer(
             return result
 
     if isinstance(message, (InlineMessage, InlineCall)):
+        if coalesce:
+            edit_scheduler.scheduler.edit_inline(message, response)
+            return message
+
+        edit_scheduler.scheduler.cancel_inline(message)
         await message.edit(response)
         return message
 
@@ -305,6 +329,9 @@ async def answer(
         )
     )
 
+    if hasattr(response, "__aiter__"):
+        return await _answer_stream(message, response, parse_mode, **kwargs)
+
     if isinstance(response, str) and not kwargs.pop("asfile", False):
         text, entity = parse_mode.parse(response)
 
@@ -342,6 +369,18 @@ async def answer(
 
                 return result
 
+        if edit and coalesce:
+            edit_scheduler.scheduler.edit(
+                message,
+                text,
+                parse_mode=lambda t: (t, entity),
+                **kwargs,
+            )
+            return message
+
+        if edit:
+            edit_scheduler.scheduler.cancel_message(message)
+
         result = await (message.edit if edit else message.respond)(
             text,
             parse_mode=lambda t: (t, entity),
@@ -485,8 +524,21 @@ async def asset_channel(
     :param _folder: Do not use it, or things will go wrong
     :returns: Peer and bool: is channel new or pre-existent
     """
+    db = getattr(client, "hikka_db", None)
+    channels = db.get(__name__, "asset_channels", {}) if db is not None else {}
+
+    if title in channels:
+        # Validate saved channel with single request instead of scanning dialogs
+        with contextlib.suppress(Exception):
+            peer = await client.get_entity(PeerChannel(channels[title]))
+            if not getattr(peer, "left", True):
+                return peer, False
+
+        logging.debug(f"Saved asset channel {title} is not available anymore")
+
     async for d in client.iter_dialogs():
         if d.title == title:
+            _save_asset_channel(db, title, d.entity)
             return d.entity, False
 
     peer = (
@@ -499,6 +551,8 @@ async def asset_channel(
         )
     ).chats[0]
 
+    _save_asset_channel(db, title, peer)
+
     if silent:
         await dnd(client, peer, archive)
     elif archive:
@@ -516,13 +570,13 @@ async def asset_channel(
         try:
             folder = next(folder for folder in folders if folder.title == "hikka")
         except Exception:
-            return
+            return peer, True
 
         if any(
             peer.id == getattr(folder_peer, "channel_id", None)
             for folder_peer in folder.include_peers
         ):
-            return
+            return peer, True
 
         folder.include_peers += [await client.get_input_entity(peer)]
 
@@ -536,6 +590,19 @@ async def asset_channel(
     return peer, True
 
 
+def _save_asset_channel(
+    db: "Database",  # type: ignore
+    title: str,
+    peer: Channel,
+):
+    if db is not None:
+        db.set(
+            __name__,
+            "asset_channels",
+            {**db.get(__name__, "asset_channels", {}), title: peer.id},
+        )
+
+
 async def dnd(
     client: "TelegramClient",  # type: ignore
     peer: Entity,
@@ -648,6 +715,69 @@ def ascii_face() -> str:
     )
 
 
+async def _answer_stream(
+    message: Message,
+    response: AsyncIterable[str],
+    parse_mode: Any,
+    **kwargs,
+) -> Message:
+    """
+    Send text chunks, produced by `response`, progressively. Only the
+    unfinished page is kept in memory
+    """
+    reply_to = kwargs.pop("reply_to", None)
+    current = message if message.out else None
+    last = message
+    page = ""
+
+    async def put(html: str, final: bool):
+        nonlocal current, last
+        text, entity = parse_mode.parse(html)
+        if not text.strip():
+            return
+
+        if current is None:
+            current = await message.client.send_message(
+                message.peer_id,
+                text,
+                parse_mode=lambda t: (t, entity),
+                reply_to=reply_to,
+                **kwargs,
+            )
+        elif final:
+            edit_scheduler.scheduler.cancel_message(current)
+            # Scheduler may have already sent the same text
+            with contextlib.suppress(MessageNotModifiedError):
+                await current.edit(text, parse_mode=lambda t: (t, entity), **kwargs)
+        else:
+            edit_scheduler.scheduler.edit(
+                current,
+                text,
+                parse_mode=lambda t: (t, entity),
+                **kwargs,
+            )
+            return
+
+        last = current
+        if final:
+            # Next page is sent as separate message
+            current = None
+
+    async for chunk in response:
+        page += chunk
+        text, entity = parse_mode.parse(page)
+        pages = list(smart_split(text, entity, 4096)) if text else [""]
+
+        for full in pages[:-1]:
+            await put(full, True)
+
+        page = pages[-1]
+        await put(page, False)
+
+    await put(page, True)
+    return last
+
+
 def array_sum(array: List[Any], /) -> List[Any]:
     """Performs basic sum operation on array"""
     result = []
@@ -683,125 +813,100 @@ def smart_split(
     :return:
     """
 
-    # Authored by @bsolute
+    # Based on the splitter, authored by @bsolute
     # https://t.me/LonamiWebs/27777
 
-    encoded = text.encode("utf-16le")
-    pending_entities = entities
+    # Offsets of each character in UTF-16 code units, which are used by
+    # Telegram for lengths and entities. It's built once, so the text is never
+    # re-encoded while splitting
+    utf16 = list(
+        itertools.accumulate(
+            (2 if ord(char) > 0xFFFF else 1 for char in text),
+            initial=0,
+        )
+    )
+
+    # Entities are visited in order of their offsets. Those, which may still
+    # have part in the next messages, are kept in `active`
+    pending_entities = sorted(entities, key=lambda x: x.offset)
+    next_entity = 0
+    active = []
+
     text_offset = 0
-    bytes_offset = 0
     text_length = len(text)
-    bytes_length = len(encoded)
 
     while text_offset < text_length:
-        if bytes_offset + length * 2 >= bytes_length:
-            yield parser.unparse(
-                text[text_offset:],
-                list(sorted(pending_entities, key=lambda x: x.offset)),
-            )
-            break
-
-        codepoint_count = len(
-            encoded[bytes_offset : bytes_offset + length * 2].decode(
-                "utf-16le",
-                errors="ignore",
-            )
+        start_utf16 = utf16[text_offset]
+        # The last character, which still fits in the message
+        max_index = max(
+            bisect.bisect_right(utf16, start_utf16 + length) - 1,
+            text_offset + 1,
         )
 
-        for search in split_on:
-            search_index = text.rfind(
-                search,
-                text_offset + min_length,
-                text_offset + codepoint_count,
-            )
-            if search_index != -1:
-                break
+        if max_index >= text_length:
+            split_index = text_length
+            exclude = 0
         else:
-            search_index = text_offset + codepoint_count
+            for search in split_on:
+                search_index = text.rfind(search, text_offset + min_length, max_index)
+                if search_index != -1:
+                    break
+            else:
+                search_index = max_index
 
-        split_index = grapheme.safe_split_index(text, search_index)
+            # Grapheme break depends only on nearby characters,
+            # so there is no need to pass the whole text
+            split_index = text_offset + grapheme.safe_split_index(
+                text[text_offset : search_index + 1],
+                search_index - text_offset,
+            )
+            if split_index <= text_offset:
+                # Grapheme is longer than message
+                split_index = search_index
+
+            exclude = 0
+            while (
+                split_index + exclude < text_length
+                and text[split_index + exclude] in split_on
+            ):
+                exclude += 1
 
-        split_offset_utf16 = (
-            len(text[text_offset:split_index].encode("utf-16le"))
-        ) // 2
-        exclude = 0
+        end_utf16 = utf16[split_index]
+        next_utf16 = utf16[split_index + exclude]
 
         while (
-            split_index + exclude < text_length
-            and text[split_index + exclude] in split_on
+            next_entity < len(pending_entities)
+            and pending_entities[next_entity].offset < end_utf16
         ):
-            exclude += 1
+            active.append(pending_entities[next_entity])
+            next_entity += 1
 
         current_entities = []
-        entities = pending_entities.copy()
-        pending_entities = []
-
-        for entity in entities:
-            if (
-                entity.offset < split_offset_utf16
-                and entity.offset + entity.length > split_offset_utf16 + exclude
-            ):
-                # spans boundary
-                current_entities.append(
-                    _copy_tl(
-                        entity,
-                        length=split_offset_utf16 - entity.offset,
-                    )
-                )
-                pending_entities.append(
-                    _copy_tl(
-                        entity,
-                        offset=0,
-                        length=entity.offset
-                        + entity.length
-                        - split_offset_utf16
-                        - exclude,
-                    )
-                )
-            elif entity.offset < split_offset_utf16 < entity.offset + entity.length:
-                # overlaps boundary
-                current_entities.append(
-                    _copy_tl(
-                        entity,
-                        length=split_offset_utf16 - entity.offset,
-                    )
-                )
-            elif entity.offset < split_offset_utf16:
-                # wholly left
-                current_entities.append(entity)
-            elif (
-                entity.offset + entity.length
-                > split_offset_utf16 + exclude
-                > entity.offset
-            ):
-                # overlaps right boundary
-                pending_entities.append(
-                    _copy_tl(
-                        entity,
-                        offset=0,
-                        length=entity.offset
-                        + entity.length
-                        - split_offset_utf16
-                        - exclude,
-                    )
-                )
-            elif entity.offset + entity.length > split_offset_utf16 + exclude:
-                # wholly right
-                pending_entities.append(
-                    _copy_tl(
-                        entity,
-                        offset=entity.offset - split_offset_utf16 - exclude,
-                    )
+        for entity in active:
+            offset = max(entity.offset, start_utf16)
+            entity_length = min(entity.offset + entity.length, end_utf16) - offset
+            if entity_length <= 0:
+                continue
+
+            current_entities.append(
+                entity
+                if offset == entity.offset
+                and entity_length == entity.length
+                and not start_utf16
+                else _copy_tl(
+                    entity,
+                    offset=offset - start_utf16,
+                    length=entity_length,
                 )
+            )
 
-        current_text = text[text_offset:split_index]
-        yield parser.unparse(
-            current_text,
-            list(sorted(current_entities, key=lambda x: x.offset)),
-        )
+        active = [
+            entity for entity in active if entity.offset + entity.length > next_utf16
+        ]
+
+        yield parser.unparse(text[text_offset:split_index], current_entities)
 
         text_offset = split_index + exclude
-        bytes_offset += len(current_text.encode("utf-16le"))
 
 
 def _copy_tl(o, **kwargs):
@@ -57,8 +57,14 @@ class Web(root.Web):
         )
         self.app["static_root_url"] = "/static"
 
+        self._webhooks = {}
+        # Updates, which are being processed. Tasks are referenced
+        # here, so they are not garbage collected
+        self._webhook_tasks = set()
+
         super().__init__(**kwargs)
         self.app.router.add_get("/favicon.ico", self.favicon)
+        self.app.router.add_post("/webhook/{secret}", self.webhook)
         self.app.router.add_static("/static/", "web-resources/static")
 
     async def start_if_ready(self, total_count: int, port: int):
@@ -193,6 +199,34 @@ class Web(root.Web):
     async def add_loader(self, client, loader, db):
         self.client_data[client._tg_id] = (loader, client, db)
 
+    def register_webhook(self, secret: str, callback: callable):
+        """
+        Route updates, posted to `/webhook/<secret>`, to `callback`
+        :param secret: Unguessable path of webhook
+        :param callback: Coroutine function, accepting update as `dict`
+        """
+        self._webhooks[secret] = callback
+
+    def unregister_webhook(self, secret: str):
+        self._webhooks.pop(secret, None)
+
+    async def webhook(self, request):
+        callback = self._webhooks.get(request.match_info["secret"])
+        if callback is None:
+            return web.Response(status=404)
+
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        # Telegram waits for response before sending the next update,
+        # so it's processed in background
+        task = asyncio.ensure_future(callback(update))
+        self._webhook_tasks.add(task)
+        task.add_done_callback(self._webhook_tasks.discard)
+        return web.Response()
+
     @staticmethod
     async def favicon(request):
         return web.Response(